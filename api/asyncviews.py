@@ -0,0 +1,84 @@
+"""Async read paths for ASGI servers.
+
+Under ASGI a sync view pins a thread of Django's single thread-sensitive
+executor for the whole request, so one worker serves one request at a
+time. With ASYNC_READ_VIEWS, viewsets with `AsyncReadMixin` are async
+views instead: their read actions run in the default thread pool through
+`database_sync_to_async`, so one worker overlaps many reads while the
+event loop keeps talking to slow clients, and writes still go through
+Django's thread-sensitive executor. Under WSGI, where Django would have
+to drive the async view with async_to_sync, the sync views are kept;
+requests that are not ASGIRequests (the test client) read on their own
+thread all the same.
+
+Django 3.2 has no async ORM interface (`QuerySet.aget()` and async
+iteration arrive in 4.1) and DRF views are synchronous, so the DRF view
+(queries, serialization and rendering) runs in the pool as a whole.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+
+from .timing import time_queries
+
+READ_METHODS = ('get', 'head')
+
+
+def database_sync_to_async(func):
+    """sync_to_async outside the thread-sensitive executor, for reads.
+
+    Pool threads keep their database connections between calls, so
+    stale ones are closed around each call, as Django does around a
+    request and Channels' helper of the same name does.
+    """
+    def run(*args, **kwargs):
+        close_old_connections()
+        time_queries()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def render(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if callable(getattr(response, 'render', None)):
+        # In the pool rather than in Django's executor afterwards
+        response.render()
+    return response
+
+
+class AsyncReadMixin:
+    """Serve `async_read_actions` from an async view; other methods of
+    the same route are handed to the sync view.
+    """
+    async_read_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_READ_VIEWS:
+            return view
+        reads = {method for method, action in actions.items()
+                 if method in READ_METHODS
+                 and action in cls.async_read_actions}
+        if not reads:
+            return view
+        if 'get' in reads:
+            reads.add('head')
+        read_in_pool = database_sync_to_async(render)
+        read = sync_to_async(render, thread_sensitive=True)
+        write = sync_to_async(view, thread_sensitive=True)
+
+        @wraps(view)
+        async def async_view(request, *args, **kwargs):
+            if request.method.lower() not in reads:
+                return await write(request, *args, **kwargs)
+            if isinstance(request, ASGIRequest):
+                return await read_in_pool(view, request, *args, **kwargs)
+            return await read(view, request, *args, **kwargs)
+        return async_view
@@ -0,0 +1,131 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed, InvalidToken
+)
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+SNAPSHOT_FIELDS = ('id', 'username', 'role', 'is_active')
+
+# Claims added to access tokens by ConfirmationCodeSerializer.get_token
+CLAIM_FIELDS = ('username', 'role')
+
+
+def user_cache_key(user_id):
+    return f'jwt-user:{user_id}'
+
+
+def revoked_before_key(user_id):
+    return f'jwt-revoked-before:{user_id}'
+
+
+def forget_user(user_id):
+    caches[settings.AUTH_USER_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+def revoke_user_tokens(user_id):
+    """Reject claim tokens of the user issued before now.
+
+    The cutoff is kept in the AUTH_USER_CACHE_ALIAS cache, which has to be
+    shared by all the workers (see api.checks).
+    """
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    caches[settings.AUTH_USER_CACHE_ALIAS].set(
+        revoked_before_key(user_id), time.time(), int(lifetime) + 1
+    )
+
+
+def is_token_revoked(validated_token):
+    """Default JWT_REVOCATION_CHECK: cache marker set by revoke_user_tokens.
+
+    `iat` has sub-second precision (ConfirmationCodeSerializer.get_token),
+    so a token issued right after the revocation is still accepted.
+    """
+    revoked_before = caches[settings.AUTH_USER_CACHE_ALIAS].get(
+        revoked_before_key(validated_token[api_settings.USER_ID_CLAIM])
+    )
+    if revoked_before is None:
+        return False
+    return validated_token.get('iat', 0) < revoked_before
+
+
+def token_user(validated_token):
+    """User instance built from token claims, other fields deferred"""
+    values = (
+        validated_token[api_settings.USER_ID_CLAIM],
+        *(validated_token[claim] for claim in CLAIM_FIELDS),
+        True,
+    )
+    return User.from_db(
+        router.db_for_read(User), ('id', *CLAIM_FIELDS, 'is_active'), values
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that keeps a snapshot of the user in the cache.
+
+    The user is rebuilt from SNAPSHOT_FIELDS without a query; any other
+    field is deferred and loaded from the database on first access. The
+    snapshot expires after AUTH_USER_CACHE_TIMEOUT and is dropped by
+    api.signals whenever the user is saved or deleted.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+        key = user_cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            values = User.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*SNAPSHOT_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed(
+                    _('User not found'), code='user_not_found'
+                )
+            cache.set(key, values, settings.AUTH_USER_CACHE_TIMEOUT)
+        user = User.from_db(router.db_for_read(User), SNAPSHOT_FIELDS, values)
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """Build the user from the `username` and `role` claims of the token.
+
+    No database or user cache access is needed unless the token predates
+    the claims, in which case CachedJWTAuthentication takes over. Tokens
+    are checked with the JWT_REVOCATION_CHECK callable (if set), so a
+    role change or deactivation takes effect before the token expires.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        revocation_check = settings.JWT_REVOCATION_CHECK
+        if revocation_check and import_string(revocation_check)(
+                validated_token):
+            raise AuthenticationFailed(
+                _('Token has been revoked'), code='token_revoked'
+            )
+        return token_user(validated_token)
@@ -0,0 +1,298 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections, router, transaction
+from django.db.models import AutoField
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+
+from .cache import bump_versions
+
+BULK_HANDLERS = {
+    'POST': 'bulk_create',
+    'PATCH': 'bulk_update',
+    'DELETE': 'bulk_destroy',
+}
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def reserve_sqlite_ids(model, count, db):
+    """Move the AUTOINCREMENT counter of the model's table `count` ids
+    ahead and return the first of them.
+
+    The UPDATE takes SQLite's write lock, which the caller's transaction
+    holds until it commits, so no other connection can take the same ids.
+    """
+    table = model._meta.db_table
+    with connections[db].cursor() as cursor:
+        cursor.execute(
+            'UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s',
+            [count, table]
+        )
+        if not cursor.rowcount:
+            # Nothing was ever inserted into the table
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, count]
+            )
+            return 1
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s', [table]
+        )
+        return cursor.fetchone()[0] - count + 1
+
+
+def bulk_create_with_pks(model, objs):
+    """bulk_create() that also sets primary keys on backends which do not
+    return them from a multi-row INSERT (SQLite before Django 4.0).
+
+    On SQLite the ids are reserved up front and assigned explicitly; on
+    other such backends the rows are inserted one at a time, each INSERT
+    reading back its own id as Model.save() does, without model signals.
+    """
+    db = router.db_for_write(model)
+    connection = connections[db]
+    if not objs or connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    with transaction.atomic(using=db, savepoint=False):
+        if connection.vendor == 'sqlite':
+            first_id = reserve_sqlite_ids(model, len(objs), db)
+            for pk, obj in enumerate(objs, first_id):
+                obj.pk = pk
+            return model.objects.bulk_create(objs)
+        opts = model._meta
+        fields = [field for field in opts.concrete_fields
+                  if not isinstance(field, AutoField)]
+        for obj in objs:
+            obj._prepare_related_fields_for_save(operation_name='bulk_create')
+            row, = model._base_manager.using(db)._insert(
+                [obj], fields=fields,
+                returning_fields=opts.db_returning_fields, using=db,
+            )
+            for value, field in zip(row, opts.db_returning_fields):
+                setattr(obj, field.attname, value)
+            obj._state.adding = False
+            obj._state.db = db
+    return objs
+
+
+def pop_unique_validators(serializer):
+    """Detach per-item uniqueness checks, they cost a query per item"""
+    unique = {}
+    for name, field in serializer.fields.items():
+        validators = [validator for validator in field.validators
+                      if isinstance(validator, UniqueValidator)]
+        if validators:
+            field.validators = [validator for validator in field.validators
+                                if validator not in validators]
+            unique[name] = validators[0]
+    return unique
+
+
+def to_lookup(field, value):
+    """`value` coerced by the model field, None if it is not a valid one"""
+    if not isinstance(value, (str, int)) or isinstance(value, bool):
+        return None
+    try:
+        value = field.to_python(value)
+    except DjangoValidationError:
+        return None
+    if isinstance(value, int) and abs(value) > MAX_INTEGER:
+        # Too large for the database to compare with (OverflowError)
+        return None
+    return value
+
+
+class BulkMixin:
+    """`bulk/<prefix>/` endpoint that takes arrays of objects.
+
+    POST creates the items of the list, DELETE removes the objects whose
+    `bulk_lookup_field` (`lookup_field` by default) values are listed.
+    A batch is all or nothing: if any item is invalid the response is 400
+    with a list of errors aligned with the input (`{}` for valid items)
+    and nothing is written. Rows
+    are written with bulk_create, so model signals do not run; the cache
+    namespaces in `bulk_cache_namespaces` are bumped instead.
+
+    The endpoint is routed with `as_bulk_view()` outside the viewset's
+    prefix, where it cannot shadow an object whose slug is "bulk".
+    """
+    bulk_max_size = 1000
+    bulk_lookup_field = None
+    bulk_cache_namespaces = ()
+    bulk_methods = ('post', 'delete')
+
+    @classmethod
+    def as_bulk_view(cls, **initkwargs):
+        return cls.as_view(
+            {method: 'bulk' for method in cls.bulk_methods}, **initkwargs
+        )
+
+    def bulk(self, request, *args, **kwargs):
+        handler = getattr(self, BULK_HANDLERS[request.method])
+        return handler(request)
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Expected a non-empty list'
+                ]
+            })
+        if len(items) > self.bulk_max_size:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                f'No more than {self.bulk_max_size} items per request'
+            ]})
+        return items
+
+    def get_bulk_lookup_field(self):
+        return self.bulk_lookup_field or self.lookup_field
+
+    def get_bulk_model(self):
+        return self.get_serializer_class().Meta.model
+
+    def check_bulk_unique(self, items, unique, errors):
+        """One query per unique field instead of one per item"""
+        model = self.get_bulk_model()
+        for name, validator in unique.items():
+            values = [item.get(name) for item in items
+                      if isinstance(item, dict)]
+            existing = set(model.objects.filter(
+                **{f'{name}__in': [value for value in values if value]}
+            ).values_list(name, flat=True))
+            seen = set()
+            for item, item_errors in zip(items, errors):
+                value = item.get(name) if isinstance(item, dict) else None
+                if not value or name in item_errors:
+                    continue
+                if value in existing or value in seen:
+                    item_errors[name] = [validator.message]
+                seen.add(value)
+
+    def resolve_bulk_relations(self, items, errors):
+        """Extra save() keyword arguments for every item"""
+        return [{} for _ in items]
+
+    def raise_bulk_errors(self, errors):
+        if any(errors):
+            raise ValidationError(errors)
+
+    def perform_bulk_create(self, validated_data, relations):
+        model = self.get_bulk_model()
+        return bulk_create_with_pks(model, [
+            model(**attrs, **extra)
+            for attrs, extra in zip(validated_data, relations)
+        ])
+
+    def get_bulk_result(self, objs):
+        return objs
+
+    def bulk_create(self, request):
+        items = self.get_bulk_items(request)
+        self.raise_bulk_errors([
+            {} if isinstance(item, dict) else
+            {api_settings.NON_FIELD_ERRORS_KEY: ['Expected a dictionary']}
+            for item in items
+        ])
+        serializer = self.get_serializer(data=items, many=True)
+        unique = pop_unique_validators(serializer.child)
+        serializer.is_valid()
+        errors = [dict(error) for error in serializer.errors] or [
+            {} for _ in items
+        ]
+        self.check_bulk_unique(items, unique, errors)
+        relations = self.resolve_bulk_relations(items, errors)
+        self.raise_bulk_errors(errors)
+        db = router.db_for_write(self.get_bulk_model())
+        with transaction.atomic(using=db):
+            objs = self.perform_bulk_create(
+                serializer.validated_data, relations
+            )
+        bump_versions(*self.bulk_cache_namespaces)
+        serializer = self.get_serializer(self.get_bulk_result(objs),
+                                         many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_destroy(self, request):
+        values = self.get_bulk_items(request)
+        field = self.get_bulk_lookup_field()
+        model = self.get_bulk_model()
+        errors = [{} if isinstance(value, (str, int)) else
+                  {field: ['Expected a string or a number']}
+                  for value in values]
+        self.raise_bulk_errors(errors)
+        # "5" and 5 name the same object, "abc" names none
+        model_field = model._meta.get_field(field)
+        lookups = [to_lookup(model_field, value) for value in values]
+        queryset = model.objects.filter(**{f'{field}__in': [
+            lookup for lookup in lookups if lookup is not None
+        ]})
+        existing = set(queryset.values_list(field, flat=True))
+        errors = [{} if lookup in existing else {field: ['Not found']}
+                  for lookup in lookups]
+        self.raise_bulk_errors(errors)
+        with transaction.atomic(using=queryset.db):
+            queryset.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class BulkUpdateMixin(BulkMixin):
+    """Also PATCH `bulk/<prefix>/` with a list of partial updates.
+
+    Every item carries the `bulk_lookup_field` of the object it changes;
+    all objects are loaded with one query and written with bulk_update.
+    """
+    bulk_methods = ('post', 'patch', 'delete')
+
+    def perform_bulk_update(self, instances, validated_data, relations):
+        fields = set()
+        for instance, attrs, extra in zip(instances, validated_data,
+                                          relations):
+            for name, value in {**attrs, **extra}.items():
+                setattr(instance, name, value)
+                fields.add(name)
+        if fields:
+            self.get_bulk_model().objects.bulk_update(instances, fields)
+        return instances
+
+    def bulk_update(self, request):
+        items = self.get_bulk_items(request)
+        field = self.get_bulk_lookup_field()
+        model_field = self.get_bulk_model()._meta.get_field(field)
+        # "5" and 5 find the same object: in_bulk() keys by the field type
+        lookups = [to_lookup(model_field, item.get(field))
+                   if isinstance(item, dict) else None for item in items]
+        objects = self.get_bulk_model().objects.in_bulk(
+            [value for value in lookups if value is not None],
+            field_name=field
+        )
+        errors, instances, validated_data = [], [], []
+        for item, lookup in zip(items, lookups):
+            if not isinstance(item, dict):
+                errors.append({api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Expected a dictionary'
+                ]})
+                continue
+            instance = objects.get(lookup)
+            if instance is None:
+                errors.append({field: ['Not found']})
+                continue
+            serializer = self.get_serializer(instance, data=item,
+                                             partial=True)
+            serializer.is_valid()
+            errors.append(dict(serializer.errors))
+            instances.append(instance)
+            validated_data.append(serializer.validated_data)
+        relations = self.resolve_bulk_relations(items, errors)
+        self.raise_bulk_errors(errors)
+        db = router.db_for_write(self.get_bulk_model())
+        with transaction.atomic(using=db):
+            instances = self.perform_bulk_update(
+                instances, validated_data, relations
+            )
+        bump_versions(*self.bulk_cache_namespaces)
+        serializer = self.get_serializer(self.get_bulk_result(instances),
+                                         many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,158 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .metrics import registry
+
+CATALOG_NAMESPACES = ('genres', 'categories', 'titles', 'titles-detail')
+VERSION_TIMEOUT_FACTOR = 12
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def version_key(name):
+    return f'api-cache-version:{name}'
+
+
+def modified_key(name):
+    return f'api-cache-modified:{name}'
+
+
+def version_timeout():
+    # Counters are created for any id in a URL, existing or not, so they
+    # must expire; they outlive the responses cached under them so that
+    # ETags and Last-Modified of quiet objects stay put for a while.
+    return settings.API_CACHE_TIMEOUT * VERSION_TIMEOUT_FACTOR
+
+
+def new_version():
+    # A missing counter restarts from the clock, so entries stored under
+    # an evicted counter's old values are never hit again.
+    return int(time.time() * 1000)
+
+
+def get_or_init_many(defaults):
+    cache = get_cache()
+    values = cache.get_many(list(defaults))
+    missing = {
+        key: value for key, value in defaults.items() if key not in values
+    }
+    if missing:
+        timeout = version_timeout()
+        for key, value in missing.items():
+            cache.add(key, value, timeout=timeout)
+        values.update(cache.get_many(list(missing)))
+    return [values.get(key, defaults[key]) for key in defaults]
+
+
+def get_versions(names):
+    return get_or_init_many({version_key(name): new_version()
+                             for name in names})
+
+
+def get_versions_and_last_modified(names):
+    """Versions of the names and the time the newest of them was bumped"""
+    now = int(time.time())
+    values = get_or_init_many({
+        **{version_key(name): new_version() for name in names},
+        **{modified_key(name): now for name in names},
+    })
+    return values[:len(names)], max(values[len(names):], default=now)
+
+
+def bump_versions(*names):
+    """Invalidate every cached response that depends on the given names.
+
+    Inside a transaction the bump waits for the commit: bumped earlier,
+    the version would let a concurrent reader cache the data it still
+    sees from before the commit and serve it afterwards.
+    """
+    transaction.on_commit(lambda: bump_versions_now(names))
+
+
+def bump_versions_now(names):
+    cache = get_cache()
+    timeout = version_timeout()
+    for name in names:
+        try:
+            # incr() keeps the expiry, after which the count restarts
+            # from the clock
+            cache.incr(version_key(name))
+        except ValueError:
+            cache.set(version_key(name), new_version(), timeout=timeout)
+    now = int(time.time())
+    cache.set_many({modified_key(name): now for name in names},
+                   timeout=timeout)
+
+
+def clear_catalog_cache():
+    bump_versions(*CATALOG_NAMESPACES)
+
+
+class CachedListMixin:
+    """Cache successful list responses of a read-mostly viewset.
+
+    Responses are keyed by host, path and query string plus the current
+    version of every namespace the view depends on; signals bump those
+    versions on writes (see api.signals), which makes old entries
+    unreachable.
+    """
+    cache_namespace = None
+
+    def get_cache_dependencies(self):
+        return (self.cache_namespace,)
+
+    def get_cache_key(self, request):
+        names = self.get_cache_dependencies()
+        versions = get_versions(names)
+        raw = '|'.join([
+            request.get_host(), request.get_full_path(),
+            *(f'{name}={version}' for name, version in zip(names, versions)),
+        ])
+        return 'api-cache:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        labels = {'namespace': self.cache_namespace}
+        if data is not None:
+            registry.inc('api_cache_requests_total',
+                         {**labels, 'result': 'hit'})
+            return Response(data)
+        registry.inc('api_cache_requests_total', {**labels, 'result': 'miss'})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedListMixin):
+    """Also cache detail responses.
+
+    A detail response depends on `<namespace>-detail` and
+    `<namespace>:<pk>`, so a change to one object does not drop the
+    cached responses of the others.
+    """
+
+    def get_cache_dependencies(self):
+        if self.action != 'retrieve':
+            return super().get_cache_dependencies()
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return (f'{self.cache_namespace}-detail',
+                f'{self.cache_namespace}:{lookup}')
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
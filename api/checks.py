@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core import checks
+
+# Cache backends whose entries are seen by one process only
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+SHARED_CACHE_HINT = ('Set CACHE_BACKEND and CACHE_LOCATION to a Redis or '
+                     'memcached server')
+
+
+def process_local_backend(alias):
+    """The backend of the cache alias if it is local to the process"""
+    backend = settings.CACHES[alias]['BACKEND']
+    return backend if backend in PROCESS_LOCAL_CACHES else None
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def check_token_revocation_cache(app_configs, **kwargs):
+    """The default JWT_REVOCATION_CHECK only works with a shared cache"""
+    if settings.JWT_REVOCATION_CHECK != 'api.authentication.is_token_revoked':
+        return []
+    alias = settings.AUTH_USER_CACHE_ALIAS
+    backend = process_local_backend(alias)
+    if backend is None:
+        return []
+    return [checks.Error(
+        f'Tokens are revoked through the {alias!r} cache, but {backend} is '
+        f'not shared between worker processes: a revoked token would still '
+        f'be accepted by the other workers.',
+        hint=f'{SHARED_CACHE_HINT}, or JWT_REVOCATION_CHECK to None.',
+        id='api.E001',
+    )]
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_response_cache(app_configs, **kwargs):
+    """Writes invalidate cached responses only in a shared cache"""
+    alias = settings.API_CACHE_ALIAS
+    backend = process_local_backend(alias)
+    if backend is None:
+        return []
+    return [checks.Error(
+        f'Responses are cached in the {alias!r} cache, but {backend} is not '
+        f'shared between processes: writes made by another worker or by '
+        f'load_csv, rebuild_ratings and generate_dataset do not invalidate '
+        f'them, and stale responses are served and revalidated with 304.',
+        hint=f'{SHARED_CACHE_HINT}.',
+        id='api.E002',
+    )]
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def check_throttle_cache(app_configs, **kwargs):
+    """Token buckets in a per-process cache multiply the rate limits"""
+    alias = settings.THROTTLE_CACHE_ALIAS
+    backend = process_local_backend(alias)
+    if backend is None:
+        return []
+    return [checks.Warning(
+        f'Rate limits are counted in the {alias!r} cache, but {backend} is '
+        f'not shared between worker processes: each worker allows the full '
+        f'rate.',
+        hint=f'{SHARED_CACHE_HINT}.',
+        id='api.W001',
+    )]
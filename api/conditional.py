@@ -0,0 +1,84 @@
+import hashlib
+import time
+
+from django.utils.cache import quote_etag
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_versions_and_last_modified
+
+
+def is_settled(last_modified):
+    """Last-Modified has one-second resolution: until its second is over,
+    another write could land in it without changing the header.
+    """
+    return last_modified < int(time.time())
+
+
+class ConditionalListMixin:
+    """ETag / Last-Modified support for list.
+
+    Validators are built from the cache version counters of the names
+    returned by the view's `get_cache_dependencies()` (bumped by
+    api.signals on every write), so answering 304 Not Modified needs no
+    database query and no serialization. Must come before the caching
+    mixins in the bases. Last-Modified is only sent, and If-Modified-Since
+    only honoured, once the second of the last write is over.
+    """
+
+    def get_validators(self, request):
+        names = self.get_cache_dependencies()
+        versions, last_modified = get_versions_and_last_modified(names)
+        raw = '|'.join([
+            request.get_full_path(), request.META.get('HTTP_ACCEPT', ''),
+            *(f'{name}={version}' for name, version in zip(names, versions)),
+        ])
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        return etag, last_modified
+
+    def is_not_modified(self, request, etag, last_modified):
+        """True, False, or None when only the handler can tell"""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            if '*' in etags:
+                # Matches any current representation, if there is one
+                return None
+            return etag in etags
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE')
+        )
+        return (if_modified_since is not None
+                and is_settled(last_modified)
+                and last_modified <= if_modified_since)
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        not_modified = self.is_not_modified(request, etag, last_modified)
+        if not_modified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            if not_modified is None:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response['ETag'] = etag
+        if is_settled(last_modified):
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+
+class ConditionalGetMixin(ConditionalListMixin):
+    """ETag / Last-Modified support for list and retrieve"""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
@@ -1,10 +1,54 @@
 import six
+from django.conf import settings
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.signing import BadSignature, TimestampSigner
 
 
 class ConfirmationCodeGenerator(PasswordResetTokenGenerator):
+    signup_salt = 'api.confirmation_code.signup'
+    login_salt = 'api.confirmation_code.login'
+
     def _make_hash_value(self, user, timestamp):
         return (
             six.text_type(user.pk) + six.text_type(timestamp) +
             six.text_type(user.is_active)
         )
+
+    def make_signup_code(self, email):
+        """Signed, expiring code for an email that has no user row yet"""
+        signed = TimestampSigner(salt=self.signup_salt).sign(email)
+        return signed[len(email) + 1:]
+
+    def check_signup_code(self, email, code):
+        if not email or not code:
+            return False
+        try:
+            TimestampSigner(salt=self.signup_salt).unsign(
+                f'{email}:{code}', max_age=settings.CONFIRMATION_CODE_TIMEOUT
+            )
+        except BadSignature:
+            return False
+        return True
+
+    def login_value(self, user):
+        # last_login moves when a token is issued, which spends the code
+        last_login = user.last_login.isoformat() if user.last_login else ''
+        return f'{user.pk}:{last_login}'
+
+    def make_login_code(self, user):
+        """Signed, expiring, single-use code for an existing active user"""
+        value = self.login_value(user)
+        signed = TimestampSigner(salt=self.login_salt).sign(value)
+        return signed[len(value) + 1:]
+
+    def check_login_code(self, user, code):
+        if not user.is_active or not code:
+            return False
+        try:
+            TimestampSigner(salt=self.login_salt).unsign(
+                f'{self.login_value(user)}:{code}',
+                max_age=settings.CONFIRMATION_CODE_TIMEOUT
+            )
+        except BadSignature:
+            return False
+        return True
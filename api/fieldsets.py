@@ -0,0 +1,158 @@
+"""Sparse fieldsets: `?fields=` and `?expand=` for read requests.
+
+`?fields=id,name` keeps only the listed fields of the response objects.
+Nested objects a serializer declares in `Meta.expandable` are embedded
+as usual unless `?expand=` is passed; then only the nested fields listed
+in it are embedded and the others render as the related object's key
+(`?expand=` alone collapses them all). The view reads just the columns
+and relations the trimmed serializer needs.
+"""
+from collections import OrderedDict
+import copy
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def is_model_field(model, name):
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+class SparseFieldsSerializerMixin:
+    """Accept `fields` and `expand` keyword arguments.
+
+    `Meta.expandable` maps nested field names to the field rendered when
+    the object is not expanded, `Meta.sparse_sources` maps computed fields
+    to the model columns they read.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = fields
+        self.sparse_expand = expand
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.sparse_fields is not None:
+            self.check_names('fields', self.sparse_fields, fields)
+            fields = OrderedDict(
+                (name, field) for name, field in fields.items()
+                if name in self.sparse_fields
+            )
+        if self.sparse_expand is not None:
+            expandable = getattr(self.Meta, 'expandable', {})
+            self.check_names('expand', self.sparse_expand, expandable)
+            for name, collapsed in expandable.items():
+                if name in fields and name not in self.sparse_expand:
+                    fields[name] = copy.deepcopy(collapsed)
+        return fields
+
+    def check_names(self, param, names, allowed):
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise serializers.ValidationError(
+                {param: [f'Unknown field: {name}' for name in unknown]}
+            )
+
+
+def sparse_plan(serializer, model, prefix=''):
+    """Columns for only(), and relations to select and prefetch.
+
+    `only` is None when a field reads something that is not a model
+    field, in which case no column can be safely deferred.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    only, select, prefetch = [], [], []
+    sources = getattr(getattr(serializer, 'Meta', None), 'sparse_sources', {})
+    for name, field in serializer.fields.items():
+        if name in sources:
+            only.extend(prefix + column for column in sources[name])
+            continue
+        source = field.source.split('.')[0]
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            only = None
+            break
+        path = prefix + source
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch.append(path)
+            continue
+        only.append(path)
+        if not model_field.is_relation or isinstance(
+                field, serializers.PrimaryKeyRelatedField):
+            continue
+        select.append(path)
+        if isinstance(field, serializers.SlugRelatedField):
+            only.append(f'{path}__{field.slug_field}')
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = sparse_plan(
+                field, model_field.related_model, f'{path}__'
+            )
+            if nested[0] is None:
+                only = None
+                break
+            only.extend(nested[0])
+            select.extend(nested[1])
+            prefetch.extend(nested[2])
+        else:
+            only = None
+            break
+    return only, select, prefetch
+
+
+class SparseFieldsMixin:
+    """Pass `?fields=` / `?expand=` of safe requests to the serializer"""
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+    # Columns read outside the serializer, e.g. the foreign key a related
+    # manager uses to attach the parent object to every row.
+    sparse_required_fields = ()
+
+    def get_sparse_options(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return {}
+        options = {}
+        for kwarg, param in (('fields', self.fields_query_param),
+                             ('expand', self.expand_query_param)):
+            value = request.query_params.get(param)
+            if value is not None:
+                options[kwarg] = parse_names(value)
+        return options
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(self.get_sparse_options())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_sparse_queryset(self, queryset):
+        """Read only what the trimmed serializer renders"""
+        if not self.get_sparse_options():
+            return queryset
+        only, select, prefetch = sparse_plan(
+            self.get_serializer(), queryset.model
+        )
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        if only is not None:
+            # Ordering columns stay loaded: cursor pagination reads them
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.only(*only, *self.sparse_required_fields, *(
+                name.lstrip('-') for name in ordering
+                if isinstance(name, str) and is_model_field(
+                    queryset.model, name.lstrip('-'))
+            ))
+        return queryset
@@ -1,5 +1,6 @@
 from django_filters import rest_framework as filters
 from .models import Title
+from .search import search_titles
 
 
 class CharFilterInFilter(filters.BaseInFilter, filters.CharFilter):
@@ -7,7 +8,7 @@ class CharFilterInFilter(filters.BaseInFilter, filters.CharFilter):
 
 
 class TitleFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='icontains')
+    name = filters.CharFilter(method='filter_name')
     year = filters.NumberFilter()
     category = filters.CharFilter(field_name='category__slug', lookup_expr='exact')
     genre = CharFilterInFilter(field_name='genre__slug', lookup_expr='in')
@@ -15,3 +16,6 @@ class TitleFilter(filters.FilterSet):
     class Meta:
         models = Title
         fields = ['category', 'year', 'name', 'genre']
+
+    def filter_name(self, queryset, name, value):
+        return search_titles(queryset, value)
@@ -0,0 +1,304 @@
+"""Send API traffic concurrently and report latency percentiles.
+
+Requests go either through the Django test client, in this process and
+against the configured database, or over HTTP to a running server, from
+threads or from asyncio tasks. A `Report` collects the latency of every
+request by endpoint and prints p50/p95/p99 per endpoint; `compare()`
+sets two reports side by side.
+"""
+import asyncio
+import json
+import math
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.db import connections
+from django.test import AsyncClient, Client
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+    """Nearest-rank percentile of sorted `values`"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+class Report:
+    """Latencies and statuses of the requests sent, by endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.elapsed = 0.0
+
+    def add(self, endpoint, status, seconds):
+        with self.lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def summary(self):
+        """Per endpoint: requests, errors, latency percentiles in ms"""
+        rows = {}
+        for endpoint in sorted(self.latencies):
+            latencies = sorted(self.latencies[endpoint])
+            statuses = self.statuses[endpoint]
+            rows[endpoint] = {
+                'requests': len(latencies),
+                'errors': sum(count for status, count in statuses.items()
+                              if not 200 <= status < 400),
+                'statuses': {str(status): count
+                             for status, count in sorted(statuses.items())},
+                **{f'p{rank}_ms': round(percentile(latencies, rank) * 1000, 2)
+                   for rank in PERCENTILES},
+                'max_ms': round(latencies[-1] * 1000, 2),
+            }
+        return rows
+
+    def format(self):
+        width = max(map(len, self.latencies), default=0) + 2
+        lines = [
+            f'{"endpoint":<{width}}{"requests":>9}{"errors":>8}'
+            + ''.join(f'{f"p{rank}, ms":>10}' for rank in PERCENTILES)
+            + f'{"max, ms":>10}'
+        ]
+        for endpoint, row in self.summary().items():
+            lines.append(
+                f'{endpoint:<{width}}{row["requests"]:>9}{row["errors"]:>8}'
+                + ''.join(f'{row[f"p{rank}_ms"]:>10.2f}'
+                          for rank in PERCENTILES)
+                + f'{row["max_ms"]:>10.2f}'
+            )
+        total = sum(len(values) for values in self.latencies.values())
+        rate = total / self.elapsed if self.elapsed else 0
+        lines.append(f'{total} requests in {self.elapsed:.2f}s '
+                     f'({rate:.1f} requests/s)')
+        return '\n'.join(lines)
+
+
+class ClientTarget:
+    """Send requests through the Django test client, in this process"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, data=None, token=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        body = json.dumps(data) if data is not None else ''
+        response = client.generic(
+            method, path, body, content_type='application/json', **headers
+        )
+        if response.streaming:
+            # Streaming responses are only produced when consumed
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    async def arequest(self, method, path, data=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        body = json.dumps(data) if data is not None else ''
+        response = await AsyncClient().generic(
+            method, path, body, content_type='application/json', **headers
+        )
+        return response.status_code
+
+    def close(self):
+        connections.close_all()
+
+
+class HTTPTarget:
+    """Send requests to a running server at `base_url`"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, data=None, token=None):
+        request = urllib.request.Request(
+            self.base_url + path, method=method,
+            data=json.dumps(data).encode() if data is not None else None,
+            headers={'Content-Type': 'application/json'},
+        )
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(request,
+                                        timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code
+        except (urllib.error.URLError, OSError):
+            # Connection errors are reported as status 0
+            return 0
+
+    async def arequest(self, method, path, data=None, token=None):
+        url = urlsplit(self.base_url + path)
+        body = json.dumps(data).encode() if data is not None else b''
+        target = url.path + (f'?{url.query}' if url.query else '')
+        lines = [
+            f'{method} {target} HTTP/1.1', f'Host: {url.netloc}',
+            'Connection: close', 'Content-Type: application/json',
+            f'Content-Length: {len(body)}',
+        ]
+        if token:
+            lines.append(f'Authorization: Bearer {token}')
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode()
+        try:
+            return await asyncio.wait_for(
+                self.exchange(url, head + body), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            # Connection errors are reported as status 0
+            return 0
+
+    async def exchange(self, url, request):
+        https = url.scheme == 'https'
+        reader, writer = await asyncio.open_connection(
+            url.hostname, url.port or (443 if https else 80), ssl=https
+        )
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            # The server closes the connection after the response
+            await reader.read()
+        finally:
+            writer.close()
+        return int(status_line.split()[1])
+
+    def close(self):
+        pass
+
+
+def send(target, report, endpoint, method, path, data, token):
+    start = time.perf_counter()
+    status = target.request(method, path, data, token)
+    report.add(endpoint, status, time.perf_counter() - start)
+
+
+async def asend(target, report, endpoint, method, path, data, token):
+    start = time.perf_counter()
+    status = await target.arequest(method, path, data, token)
+    report.add(endpoint, status, time.perf_counter() - start)
+
+
+def run(target, workloads, report):
+    """Send the requests of each workload from its own thread.
+
+    A workload is an iterable of (endpoint, method, path, data, token).
+    """
+    def send_all(requests):
+        try:
+            for request in requests:
+                send(target, report, *request)
+        finally:
+            target.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workloads)) as pool:
+        futures = [pool.submit(send_all, requests) for requests in workloads]
+        for future in futures:
+            future.result()
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def run_stream(target, requests, workers, report):
+    """Send requests from an iterable, consumed as it is read, from
+    `workers` threads.
+    """
+    pending = queue.Queue(maxsize=workers * 4)
+
+    def worker():
+        try:
+            while True:
+                request = pending.get()
+                if request is None:
+                    return
+                send(target, report, *request)
+        finally:
+            target.close()
+
+    threads = [threading.Thread(target=worker, daemon=True)
+               for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        for request in requests:
+            pending.put(request)
+    finally:
+        for _ in threads:
+            pending.put(None)
+        for thread in threads:
+            thread.join()
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+async def arun_stream(target, requests, workers, report):
+    """Like run_stream(), with `workers` asyncio tasks instead of threads"""
+    pending = asyncio.Queue(maxsize=workers * 4)
+
+    async def worker():
+        while True:
+            request = await pending.get()
+            if request is None:
+                return
+            await asend(target, report, *request)
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        for request in requests:
+            await pending.put(request)
+    finally:
+        for _ in tasks:
+            await pending.put(None)
+        await asyncio.gather(*tasks)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def change(before, after):
+    if not before:
+        return ''
+    return f'{(after - before) / before:+.0%}'
+
+
+def compare(baseline, current):
+    """Lines comparing two Report.summary() results endpoint by endpoint"""
+    width = max(map(len, {**baseline, **current}), default=0) + 2
+    lines = [
+        f'{"endpoint":<{width}}{"requests":>14}{"errors":>12}'
+        + ''.join(f'{f"p{rank}, ms":>26}' for rank in PERCENTILES)
+    ]
+    for endpoint in sorted({**baseline, **current}):
+        before, after = baseline.get(endpoint), current.get(endpoint)
+        if before is None or after is None:
+            run_name = 'current' if before is None else 'baseline'
+            lines.append(f'{endpoint:<{width}}only in the {run_name} run')
+            continue
+        line = (f'{endpoint:<{width}}'
+                f'{before["requests"]:>7}{after["requests"]:>7}'
+                f'{before["errors"]:>6}{after["errors"]:>6}')
+        for rank in PERCENTILES:
+            old, new = before[f'p{rank}_ms'], after[f'p{rank}_ms']
+            line += f'{old:>10.2f}{new:>10.2f}{change(old, new):>6}'
+        lines.append(line)
+        if before['statuses'] != after['statuses']:
+            lines.append(f'{"":<{width}}statuses {before["statuses"]} -> '
+                         f'{after["statuses"]}')
+    return '\n'.join(lines)
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Category, Comment, Genre, Review, Title
+from api.renderers import FastJSONRenderer
+from api.rows import compile_serializer
+from api.serializers import (
+    CategorySerializer, CommentSerializer, GenreSerializer, ReviewSerializer,
+    TitlesSerializer,
+)
+
+
+def cases():
+    return [
+        ('titles', TitlesSerializer, Title.objects.select_related(
+            'category').prefetch_related('genre')),
+        ('reviews', ReviewSerializer, Review.objects.select_related(
+            'author', 'title__category').prefetch_related('title__genre')),
+        ('comments', CommentSerializer,
+         Comment.objects.select_related('author')),
+        ('genres', GenreSerializer, Genre.objects.all()),
+        ('categories', CategorySerializer, Category.objects.all()),
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Compare DRF serialization with the .values() row path used '
+            'by list endpoints on the rows in the database')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Objects serialized per run, like a large list page'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Runs per path; the best time is reported'
+        )
+
+    def best_of(self, repeat, func):
+        best, result = None, None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        limit, repeat = options['limit'], options['repeat']
+        drf_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        self.stdout.write(
+            f'{"list":<12}{"objects":>8}{"drf, ms":>10}{"rows, ms":>10}'
+            f'{"speedup":>9}'
+        )
+        for name, serializer_class, queryset in cases():
+            queryset = queryset.order_by('pk')[:limit]
+            row_serializer = compile_serializer(
+                serializer_class(), queryset.model
+            )
+
+            def drf():
+                serializer = serializer_class(list(queryset), many=True)
+                return drf_renderer.render(serializer.data)
+
+            def rows():
+                return fast_renderer.render(row_serializer.serialize(
+                    row_serializer.select(queryset)
+                ))
+
+            drf_time, drf_output = self.best_of(repeat, drf)
+            rows_time, rows_output = self.best_of(repeat, rows)
+            if drf_output != rows_output:
+                raise CommandError(f'{name}: outputs differ')
+            self.stdout.write(
+                f'{name:<12}{queryset.count():>8}{drf_time * 1000:>10.2f}'
+                f'{rows_time * 1000:>10.2f}'
+                f'{drf_time / rows_time if rows_time else 0:>8.1f}x'
+            )
+        self.stdout.write(self.style.SUCCESS('Outputs are byte-identical'))
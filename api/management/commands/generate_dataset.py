@@ -0,0 +1,238 @@
+import datetime
+import random
+import time
+from functools import lru_cache
+from itertools import accumulate, product
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api.cache import clear_catalog_cache
+from api.models import Category, Comment, Genre, Review, Title
+
+from .load_csv import batches, keep_auto_now_add
+
+User = get_user_model()
+
+ADJECTIVES = (
+    'Silent', 'Red', 'Lost', 'Golden', 'Last', 'Hidden', 'Broken', 'Dark',
+    'Eternal', 'Northern', 'Little', 'Wild', 'Crimson', 'Distant', 'Frozen',
+)
+NOUNS = (
+    'River', 'Empire', 'Garden', 'Storm', 'Kingdom', 'Letter', 'Voyage',
+    'Mountain', 'Harbor', 'Symphony', 'Machine', 'Island', 'Forest', 'City',
+)
+WORDS = (
+    'great', 'boring', 'plot', 'music', 'actors', 'ending', 'classic',
+    'again', 'recommend', 'slow', 'beautiful', 'characters', 'twist', 'book',
+)
+# Scores lean towards the upper half, like real ratings do
+SCORE_WEIGHTS = (1, 1, 2, 3, 5, 8, 12, 14, 10, 6)
+
+PUB_DATE_SPAN = datetime.timedelta(days=730)
+COMMENT_DELAY = datetime.timedelta(days=30)
+
+
+@lru_cache(maxsize=None)
+def skewed_weights(count, skew):
+    """Cumulative Zipf weights: item `rank` is picked ~ 1 / (rank + 1)**skew"""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize() + '.'
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic users, catalog, reviews and '
+            'comments for load testing')
+
+    def add_arguments(self, parser):
+        for name, default in (('users', 1000), ('categories', 10),
+                              ('genres', 30), ('titles', 5000),
+                              ('reviews', 50000), ('comments', 100000)):
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Number of {name} to create (default {default})'
+            )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent of title popularity and user activity; '
+                 '0 spreads reviews and comments evenly'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Random seed, for a reproducible dataset'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per INSERT statement'
+        )
+
+    def handle(self, *args, **options):
+        counts = {name: options[name] for name in (
+            'users', 'categories', 'genres', 'titles', 'reviews', 'comments'
+        )}
+        if any(count < 0 for count in counts.values()):
+            raise CommandError('Counts cannot be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number')
+        if counts['reviews'] and not (counts['users'] and counts['titles']):
+            raise CommandError('Reviews need --users and --titles')
+        if counts['reviews'] > counts['users'] * counts['titles']:
+            raise CommandError(
+                'Every user reviews a title at most once: --reviews cannot '
+                'exceed --users * --titles'
+            )
+        if counts['comments'] and not counts['reviews']:
+            raise CommandError('Comments need --reviews')
+        self.rng = random.Random(options['seed'])
+        self.skew = options['skew']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        with transaction.atomic():
+            users = self.create(User, self.build_users, counts['users'])
+            categories = self.create(
+                Category, self.build_categories, counts['categories']
+            )
+            genres = self.create(Genre, self.build_genres, counts['genres'])
+            titles = self.create(
+                Title, self.build_titles, counts['titles'], categories
+            )
+            if genres:
+                self.create(
+                    Title.genre.through, self.build_genre_titles,
+                    len(titles), titles, genres
+                )
+            reviews = self.create(
+                Review, self.build_reviews, counts['reviews'], titles, users
+            )
+            self.create(
+                Comment, self.build_comments, counts['comments'], reviews,
+                users
+            )
+        call_command('rebuild_ratings', stdout=self.stdout)
+        clear_catalog_cache()
+
+    def create(self, model, build, count, *related):
+        """Insert the objects yielded by build(first_id, count, *related)
+
+        Returns them in a random order, which ranks their popularity.
+        """
+        start = time.perf_counter()
+        first_id = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        objects = []
+        with keep_auto_now_add(model):
+            for batch in batches(build(first_id, count, *related),
+                                 self.batch_size):
+                model.objects.bulk_create(batch)
+                objects.extend(batch)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+        elapsed = time.perf_counter() - start
+        rate = len(objects) / elapsed if elapsed else len(objects)
+        self.stdout.write(self.style.SUCCESS(
+            f'{model._meta.db_table}: {len(objects)} rows in {elapsed:.2f}s '
+            f'({rate:.0f} rows/s)'
+        ))
+        self.rng.shuffle(objects)
+        return objects
+
+    def popular(self, objects, count):
+        """`count` of the objects; the earlier in the list, the likelier"""
+        return self.rng.choices(
+            objects, cum_weights=skewed_weights(len(objects), self.skew),
+            k=count
+        )
+
+    def past_date(self):
+        return self.now - PUB_DATE_SPAN * self.rng.random()
+
+    def build_users(self, first_id, count):
+        for pk in range(first_id, first_id + count):
+            user = User(
+                id=pk, username=f'user{pk}', email=f'user{pk}@yamdb.fake',
+                role='user',
+            )
+            user.set_unusable_password()
+            yield user
+
+    def build_categories(self, first_id, count):
+        for pk in range(first_id, first_id + count):
+            yield Category(id=pk, name=f'Category {pk}', slug=f'category-{pk}')
+
+    def build_genres(self, first_id, count):
+        for pk in range(first_id, first_id + count):
+            yield Genre(id=pk, name=f'Genre {pk}', slug=f'genre-{pk}')
+
+    def build_titles(self, first_id, count, categories):
+        rng, year = self.rng, self.now.year
+        picked = self.popular(categories, count) if categories else []
+        for index, pk in enumerate(range(first_id, first_id + count)):
+            yield Title(
+                id=pk,
+                name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {pk}',
+                year=rng.randint(year - 70, year),
+                category=picked[index] if picked else None,
+                description=sentence(rng, 12),
+            )
+
+    def build_genre_titles(self, first_id, count, titles, genres):
+        through = Title.genre.through
+        pk = first_id
+        for title in titles:
+            picked = set(self.popular(genres, self.rng.randint(1, 3)))
+            for genre in picked:
+                yield through(id=pk, title_id=title.pk, genre_id=genre.pk)
+                pk += 1
+
+    def review_pairs(self, count, titles, users):
+        """`count` distinct (title, author) pairs, skewed like the rest"""
+        seen, exhaustive = set(), False
+        while len(seen) < count:
+            # Hot titles and prolific reviewers collide often, so draw in
+            # rounds; once the skewed draws mostly hit taken pairs, the
+            # remaining ones are taken in order.
+            needed, found = count - len(seen), len(seen)
+            if exhaustive:
+                pairs = product(titles, users)
+            else:
+                pairs = zip(self.popular(titles, needed * 2),
+                            self.popular(users, needed * 2))
+            for pair in pairs:
+                key = (pair[0].pk, pair[1].pk)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield pair
+                if len(seen) == count:
+                    return
+            exhaustive = len(seen) - found < needed // 5
+
+    def build_reviews(self, first_id, count, titles, users):
+        rng = self.rng
+        pairs = self.review_pairs(count, titles, users)
+        for pk, (title, author) in enumerate(pairs, first_id):
+            yield Review(
+                id=pk, title_id=title.pk, author_id=author.pk,
+                text=sentence(rng, rng.randint(5, 40)),
+                score=rng.choices(range(1, 11), SCORE_WEIGHTS)[0],
+                pub_date=self.past_date(),
+            )
+
+    def build_comments(self, first_id, count, reviews, users):
+        rng = self.rng
+        picked = zip(self.popular(reviews, count), self.popular(users, count))
+        for pk, (review, author) in enumerate(picked, first_id):
+            yield Comment(
+                id=pk, review_id=review.pk, author_id=author.pk,
+                text=sentence(rng, rng.randint(3, 20)),
+                pub_date=min(review.pub_date + COMMENT_DELAY * rng.random(),
+                             self.now),
+            )
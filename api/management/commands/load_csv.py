@@ -0,0 +1,192 @@
+import csv
+import os
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from api.cache import clear_catalog_cache
+from api.models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+
+def build_user(row, ids):
+    user = User(
+        id=row['id'], username=row['username'], email=row['email'],
+        role=row['role'] or 'user', bio=row['description'] or None,
+        first_name=row['first_name'] or None,
+        last_name=row['last_name'] or None,
+    )
+    user.set_unusable_password()
+    return user
+
+
+def build_category(row, ids):
+    return Category(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+def build_genre(row, ids):
+    return Genre(id=row['id'], name=row['name'], slug=row['slug'])
+
+
+def build_title(row, ids):
+    return Title(
+        id=row['id'], name=row['name'], year=row['year'],
+        category_id=ids[Category].get(row['category']),
+    )
+
+
+def build_genre_title(row, ids):
+    title_id = ids[Title].get(row['title_id'])
+    genre_id = ids[Genre].get(row['genre_id'])
+    if title_id is None or genre_id is None:
+        return None
+    return Title.genre.through(
+        id=row['id'], title_id=title_id, genre_id=genre_id
+    )
+
+
+def build_review(row, ids):
+    title_id = ids[Title].get(row['title_id'])
+    author_id = ids[User].get(row['author'])
+    if title_id is None or author_id is None:
+        return None
+    if (title_id, author_id) in ids['review_keys']:
+        return None
+    ids['review_keys'].add((title_id, author_id))
+    return Review(
+        id=row['id'], title_id=title_id, author_id=author_id,
+        text=row['text'], score=row['score'] or None,
+        pub_date=row['pub_date'],
+    )
+
+
+def build_comment(row, ids):
+    review_id = ids[Review].get(row['review_id'])
+    author_id = ids[User].get(row['author'])
+    if review_id is None or author_id is None:
+        return None
+    return Comment(
+        id=row['id'], review_id=review_id, author_id=author_id,
+        text=row['text'], pub_date=row['pub_date'],
+    )
+
+
+# Load order matters: every file only references models loaded before it.
+SOURCES = (
+    ('users', User, build_user),
+    ('category', Category, build_category),
+    ('genre', Genre, build_genre),
+    ('titles', Title, build_title),
+    ('genre_title', Title.genre.through, build_genre_title),
+    ('review', Review, build_review),
+    ('comments', Comment, build_comment),
+)
+
+
+@contextmanager
+def keep_auto_now_add(model):
+    """Let bulk_create store dates from the file instead of now()"""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Load catalog, users, reviews and comments from CSV files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=os.path.join(settings.BASE_DIR, 'data'),
+            help='Directory with the CSV files'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per INSERT statement'
+        )
+        parser.add_argument(
+            '--only', nargs='+', choices=[name for name, _, _ in SOURCES],
+            help='Load only the given files'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive number')
+        ids = {
+            model: {str(pk): pk for pk in model.objects.values_list(
+                'pk', flat=True
+            )}
+            for model in (User, Category, Genre, Title, Review)
+        }
+        ids['review_keys'] = set(
+            Review.objects.values_list('title_id', 'author_id')
+        )
+        for name, model, build in SOURCES:
+            if options['only'] and name not in options['only']:
+                continue
+            path = os.path.join(options['path'], f'{name}.csv')
+            if not os.path.exists(path):
+                self.stdout.write(f'{name}: {path} not found, skipped')
+                continue
+            self.load_file(path, name, model, build, ids, options)
+        if not options['only'] or 'review' in options['only']:
+            call_command('rebuild_ratings', stdout=self.stdout)
+        clear_catalog_cache()
+
+    def load_file(self, path, name, model, build, ids, options):
+        start = time.perf_counter()
+        loaded = skipped = 0
+        with open(path, encoding='utf-8', newline='') as csv_file, \
+                transaction.atomic(), keep_auto_now_add(model):
+            rows = csv.DictReader(csv_file)
+            for batch in batches(rows, options['batch_size']):
+                objects = []
+                for row in batch:
+                    obj = build(row, ids)
+                    if obj is None:
+                        skipped += 1
+                        continue
+                    objects.append(obj)
+                model.objects.bulk_create(
+                    objects, batch_size=options['batch_size']
+                )
+                loaded += len(objects)
+                if model in ids:
+                    ids[model].update(
+                        (str(obj.pk), int(obj.pk)) for obj in objects
+                    )
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [model]
+                ):
+                    cursor.execute(sql)
+        elapsed = time.perf_counter() - start
+        rate = loaded / elapsed if elapsed else loaded
+        message = (f'{name}: {loaded} rows in {elapsed:.2f}s '
+                   f'({rate:.0f} rows/s)')
+        if skipped:
+            message += (f', {skipped} rows skipped '
+                        f'(unknown references or duplicates)')
+        self.stdout.write(self.style.SUCCESS(message))
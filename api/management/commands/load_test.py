@@ -0,0 +1,193 @@
+import json
+import random
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api.loadtest import ClientTarget, HTTPTarget, Report, run
+from api.models import Category, Genre, Review, Title
+from api.serializers import ConfirmationCodeSerializer
+
+from .generate_dataset import sentence, skewed_weights
+
+User = get_user_model()
+
+# Relative frequency of each kind of request
+READS = {
+    'GET titles/': 20,
+    'GET titles/?filters': 10,
+    'GET titles/?name=': 5,
+    'GET titles/{id}/': 20,
+    'GET titles/{id}/reviews/': 20,
+    'GET titles/{id}/reviews/{id}/comments/': 15,
+    'GET genres/': 5,
+    'GET categories/': 5,
+}
+WRITES = {
+    'POST titles/{id}/reviews/': 1,
+    'POST titles/{id}/reviews/{id}/comments/': 2,
+}
+# Users whose tokens sign the write requests. The least active ones are
+# taken, so new reviews rarely hit the one-review-per-title rule (400).
+WRITERS = 100
+
+
+class Traffic:
+    """Mixed requests over the data in the database, hot titles first"""
+
+    def __init__(self, write_ratio, skew):
+        self.write_ratio = write_ratio
+        self.titles = list(Title.objects.order_by(
+            '-rating_count', 'pk'
+        ).values_list('pk', flat=True))
+        if not self.titles:
+            raise CommandError(
+                'There are no titles; fill the database with '
+                '`manage.py generate_dataset` first'
+            )
+        self.title_weights = skewed_weights(len(self.titles), skew)
+        self.reviews = defaultdict(list)
+        for pk, title_id in Review.objects.values_list('pk', 'title_id'):
+            self.reviews[title_id].append(pk)
+        self.reviewed = [pk for pk in self.titles if pk in self.reviews]
+        self.reviewed_weights = skewed_weights(len(self.reviewed), skew)
+        self.years = list(Title.objects.order_by().values_list(
+            'year', flat=True
+        ).distinct())
+        self.genres = list(Genre.objects.values_list('slug', flat=True))
+        self.categories = list(
+            Category.objects.values_list('slug', flat=True)
+        )
+        self.words = [word for name in Title.objects.values_list(
+            'name', flat=True
+        )[:1000] for word in name.split() if len(word) > 2]
+        writers = User.objects.filter(is_active=True).annotate(
+            activity=Count('reviews')
+        ).order_by('activity', 'pk')[:WRITERS]
+        self.tokens = [str(ConfirmationCodeSerializer.get_token(user))
+                       for user in writers]
+        if write_ratio and not self.tokens:
+            raise CommandError('Write requests need at least one user')
+
+    def title(self, rng):
+        return rng.choices(self.titles, cum_weights=self.title_weights)[0]
+
+    def review(self, rng):
+        """A reviewed title and one of its reviews"""
+        title_id = rng.choices(self.reviewed,
+                               cum_weights=self.reviewed_weights)[0]
+        return title_id, rng.choice(self.reviews[title_id])
+
+    def requests(self, rng, count):
+        """`count` (endpoint, method, path, data, token) tuples"""
+        kinds, weights = [], []
+        for mix, share in ((READS, 1 - self.write_ratio),
+                           (WRITES, self.write_ratio)):
+            for kind, weight in mix.items():
+                if kind.endswith('comments/') and not self.reviewed:
+                    weight = 0
+                kinds.append(kind)
+                weights.append(weight * share / sum(mix.values()))
+        for kind in rng.choices(kinds, weights, k=count):
+            yield (kind, *self.build(rng, kind))
+
+    def build(self, rng, kind):
+        """(method, path, data, token) of a request of the given kind"""
+        method = kind.split()[0]
+        token = rng.choice(self.tokens) if method == 'POST' else None
+        if kind == 'GET titles/':
+            return method, '/api/v1/titles/', None, token
+        if kind == 'GET titles/?filters':
+            filters = []
+            if rng.random() < 0.2:
+                filters.append(f'year={rng.choice(self.years)}')
+            if self.genres:
+                filters.append(f'genre={rng.choice(self.genres)}')
+            if self.categories and rng.random() < 0.5:
+                filters.append(f'category={rng.choice(self.categories)}')
+            return method, f'/api/v1/titles/?{"&".join(filters)}', None, token
+        if kind == 'GET titles/?name=':
+            word = rng.choice(self.words) if self.words else 'the'
+            return method, f'/api/v1/titles/?name={word[:5]}', None, token
+        if kind == 'GET titles/{id}/':
+            return method, f'/api/v1/titles/{self.title(rng)}/', None, token
+        if kind == 'GET genres/':
+            return method, '/api/v1/genres/', None, token
+        if kind == 'GET categories/':
+            return method, '/api/v1/categories/', None, token
+        if kind in ('GET titles/{id}/reviews/', 'POST titles/{id}/reviews/'):
+            data = None
+            if method == 'POST':
+                data = {'text': sentence(rng, 10),
+                        'score': rng.randint(1, 10)}
+            return (method, f'/api/v1/titles/{self.title(rng)}/reviews/',
+                    data, token)
+        title_id, review_id = self.review(rng)
+        data = {'text': sentence(rng, 6)} if method == 'POST' else None
+        return (method,
+                f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+                data, token)
+
+
+class Command(BaseCommand):
+    help = ('Send mixed read/write API traffic over the data in the '
+            'database and report latency percentiles per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Total number of requests to send'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Number of threads sending requests'
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.1,
+            help='Share of requests that create reviews and comments'
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Zipf exponent of title popularity, as in generate_dataset'
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server sharing this database and '
+                 'SECRET_KEY, e.g. http://localhost:8000; by default '
+                 'requests go through the Django test client'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Random seed, for a reproducible request sequence'
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the per-endpoint results as JSON to this file'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError(
+                '--requests and --concurrency must be positive numbers'
+            )
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--write-ratio must be between 0 and 1')
+        traffic = Traffic(options['write_ratio'], options['skew'])
+        seed = options['seed']
+        concurrency = min(options['concurrency'], options['requests'])
+        workloads = []
+        for number in range(concurrency):
+            rng = random.Random(None if seed is None else seed + number)
+            count = (options['requests'] // concurrency
+                     + (number < options['requests'] % concurrency))
+            # Built up front so generating requests is not timed
+            workloads.append(list(traffic.requests(rng, count)))
+        target = (HTTPTarget(options['url']) if options['url']
+                  else ClientTarget())
+        report = run(target, workloads, Report())
+        self.stdout.write(report.format())
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report.summary(), output, indent=2)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from api.cache import bump_versions
+from api.models import Review, Title
+
+
+class Command(BaseCommand):
+    help = 'Recalculate stored title ratings from reviews'
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(
+            title=OuterRef('pk'), score__isnull=False
+        ).order_by().values('title')
+        score_sum = reviews.annotate(total=Sum('score')).values('total')
+        score_count = reviews.annotate(total=Count('pk')).values('total')
+        with transaction.atomic():
+            updated = Title.objects.update(
+                rating_sum=Coalesce(
+                    Subquery(score_sum, output_field=IntegerField()), 0
+                ),
+                rating_count=Coalesce(
+                    Subquery(score_count, output_field=IntegerField()), 0
+                ),
+            )
+        bump_versions('titles', 'titles-detail')
+        self.stdout.write(
+            self.style.SUCCESS(f'Ratings rebuilt for {updated} titles')
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.search import install_search_index, remove_search_index
+
+
+class Command(BaseCommand):
+    help = ('Recreate the title search index, e.g. after a migration '
+            'rebuilt the api_title table on SQLite')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            remove_search_index(connection)
+            install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import re
+import sys
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadtest import (
+    ClientTarget, HTTPTarget, Report, arun_stream, compare, run_stream,
+)
+from api.serializers import ConfirmationCodeSerializer
+
+User = get_user_model()
+
+API_PREFIX = '/api/v1/'
+NUMBER = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_for(method, path):
+    """Requests to the same view share an endpoint: ids become {id}"""
+    if path.startswith(API_PREFIX):
+        path = path[len(API_PREFIX) - 1:]
+    return f'{method} {NUMBER.sub("/{id}", path).lstrip("/")}'
+
+
+def read_log(lines, methods, token, skipped):
+    """(endpoint, method, path, data, token) for every request in the log.
+
+    A line is a JSON object with `method` and `path`, and optionally
+    `query` and `body`, like the lines of the api.timing log; text before
+    the object (a log prefix) is ignored. Other lines are counted in
+    `skipped` by reason.
+    """
+    for line in lines:
+        start = line.find('{')
+        if start == -1:
+            if line.strip():
+                skipped['not JSON'] += 1
+            continue
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            skipped['not JSON'] += 1
+            continue
+        if not (isinstance(record, dict) and isinstance(
+                record.get('method'), str) and isinstance(
+                record.get('path'), str)):
+            skipped['no method or path'] += 1
+            continue
+        method = record['method'].upper()
+        if method not in methods:
+            skipped[f'{method} not replayed'] += 1
+            continue
+        path, _, query = record['path'].partition('?')
+        query = record.get('query') or query
+        yield (
+            endpoint_for(method, path), method,
+            f'{path}?{query}' if query else path, record.get('body'), token,
+        )
+
+
+class Command(BaseCommand):
+    help = ('Replay a JSONL request log, such as the api.timing log, '
+            'concurrently and compare the latencies with a previous run')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'log', help='JSONL file with one request per line, - for stdin'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=8,
+            help='Number of requests in flight at a time'
+        )
+        parser.add_argument(
+            '--mode', choices=('threads', 'asyncio'), default='threads',
+            help='Send from worker threads, or from asyncio tasks (through '
+                 "Django's AsyncClient, or raw HTTP/1.1 with --url)"
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://localhost:8000; '
+                 'by default requests go through the Django test client'
+        )
+        parser.add_argument(
+            '--methods', nargs='+', default=['GET', 'HEAD'],
+            help='Methods to replay; writes are skipped unless listed here'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the user whose token signs every request; by '
+                 'default requests are anonymous'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Replay only the first N requests of the log'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the per-endpoint results as JSON to this file'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Results of an earlier run (--output of this command or of '
+                 'load_test) to compare this run with'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be a positive number')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+        token = None
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f'No user with email {options["user"]}')
+            token = str(ConfirmationCodeSerializer.get_token(user))
+        target = (HTTPTarget(options['url']) if options['url']
+                  else ClientTarget())
+        methods = {method.upper() for method in options['methods']}
+        log = (sys.stdin if options['log'] == '-'
+               else open(options['log'], encoding='utf-8'))
+        skipped = Counter()
+        try:
+            requests = islice(
+                read_log(log, methods, token, skipped), options['limit']
+            )
+            if options['mode'] == 'asyncio':
+                report = asyncio.run(arun_stream(
+                    target, requests, options['workers'], Report()
+                ))
+            else:
+                report = run_stream(
+                    target, requests, options['workers'], Report()
+                )
+        finally:
+            if log is not sys.stdin:
+                log.close()
+        self.stdout.write(report.format())
+        for reason, count in sorted(skipped.items()):
+            self.stdout.write(f'{count} lines skipped: {reason}')
+        summary = report.summary()
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(summary, output, indent=2)
+        if baseline is not None:
+            self.stdout.write('\nbaseline -> this run')
+            self.stdout.write(compare(baseline, summary))
@@ -0,0 +1,358 @@
+"""Prometheus metrics for the API, served at /metrics.
+
+Every process keeps its counters and histograms in memory. With
+METRICS_DIR set, which is required with several gunicorn workers, each
+process also writes them to its own file in that directory at most every
+METRICS_FLUSH_INTERVAL seconds, and /metrics adds up the files of all
+processes, past and present, so counters do not go backwards when a
+worker is restarted; the files of exited processes are folded into one
+totals file at scrape time. Without METRICS_DIR only the process that
+answers the scrape is reported.
+
+/metrics is closed unless the request carries METRICS_TOKEN or comes
+from one of METRICS_ALLOWED_NETWORKS.
+"""
+import asyncio
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Q
+from django.http import HttpResponse
+
+from .models import QueuedEmail
+
+TOTALS_FILE = 'totals.json'
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+METRICS = {
+    'api_requests_total': (
+        'counter', 'Requests by view, method and status'),
+    'api_request_duration_seconds': (
+        'histogram', 'Request latency by view and method'),
+    'api_db_queries_total': (
+        'counter', 'SQL queries run while handling requests'),
+    'api_db_duration_seconds_total': (
+        'counter', 'Time spent in SQL while handling requests'),
+    'api_cache_requests_total': (
+        'counter', 'Response cache lookups by namespace and result'),
+    'api_email_queue_depth': (
+        'gauge', 'Unsent queued emails, by whether they will be retried'),
+}
+
+
+def freeze(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Counters and histograms of the current process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # A forked worker starts from zero instead of re-reporting
+            # what the master had counted before the fork.
+            self.pid = os.getpid()
+            self.filename = f'{self.pid}-{uuid.uuid4().hex}.json'
+            self.counters = {}
+            self.histograms = {}
+            self.last_flush = 0.0
+
+    def check_fork(self):
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, labels, value=1):
+        self.check_fork()
+        key = (name, freeze(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=DURATION_BUCKETS):
+        self.check_fork()
+        key = (name, freeze(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': list(buckets),
+                    'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0,
+                }
+            for index, bound in enumerate(histogram['buckets']):
+                if value <= bound:
+                    histogram['counts'][index] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value
+                             in self.counters.items()],
+                'histograms': [
+                    [name, labels,
+                     {**histogram, 'counts': list(histogram['counts'])}]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+            }
+
+    def flush_due(self):
+        return bool(settings.METRICS_DIR) and (
+            time.monotonic() - self.last_flush
+            >= settings.METRICS_FLUSH_INTERVAL
+        )
+
+    def flush(self, force=False):
+        """Write the snapshot to METRICS_DIR, at most every
+        METRICS_FLUSH_INTERVAL seconds unless forced
+        """
+        directory = settings.METRICS_DIR
+        if not directory or not (force or self.flush_due()):
+            return
+        self.last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        write_snapshot(os.path.join(directory, self.filename),
+                       self.snapshot())
+
+
+registry = Registry()
+
+
+def write_snapshot(path, snapshot):
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(snapshot, file)
+    os.replace(f'{path}.tmp', path)
+
+
+def read_snapshot(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def is_exited(filename):
+    """Whether the process that wrote the `<pid>-<id>.json` file is gone"""
+    try:
+        pid = int(filename.split('-', 1)[0])
+    except ValueError:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def compact(directory):
+    """Fold the files of exited processes into TOTALS_FILE, so the files
+    read per scrape do not pile up with every worker restart.
+    """
+    import fcntl
+
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        # One scrape compacts at a time, the others wait and find nothing
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        exited = [filename for filename in os.listdir(directory)
+                  if filename.endswith('.json') and filename != TOTALS_FILE
+                  and is_exited(filename)]
+        if not exited:
+            return
+        totals_path = os.path.join(directory, TOTALS_FILE)
+        snapshots = [read_snapshot(totals_path)] + [
+            read_snapshot(os.path.join(directory, filename))
+            for filename in exited
+        ]
+        counters, histograms = merge(
+            snapshot for snapshot in snapshots if snapshot is not None
+        )
+        write_snapshot(totals_path, {
+            'counters': [[name, labels, value] for (name, labels), value
+                         in counters.items()],
+            'histograms': [[name, labels, histogram] for (name, labels),
+                           histogram in histograms.items()],
+        })
+        for filename in exited:
+            os.remove(os.path.join(directory, filename))
+
+
+def read_snapshots():
+    directory = settings.METRICS_DIR
+    if not directory:
+        return [registry.snapshot()]
+    registry.flush(force=True)
+    compact(directory)
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        snapshot = read_snapshot(os.path.join(directory, filename))
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def merge(snapshots):
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = {**histogram,
+                                   'counts': list(histogram['counts'])}
+                continue
+            total['counts'] = [a + b for a, b in
+                               zip(total['counts'], histogram['counts'])]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+    return counters, histograms
+
+
+def email_queue_gauges():
+    depth = QueuedEmail.objects.filter(sent_at__isnull=True).aggregate(
+        pending=Count('pk', filter=Q(
+            attempts__lt=settings.EMAIL_QUEUE_MAX_ATTEMPTS)),
+        failed=Count('pk', filter=Q(
+            attempts__gte=settings.EMAIL_QUEUE_MAX_ATTEMPTS)),
+    )
+    return {
+        ('api_email_queue_depth', (('state', state),)): value
+        for state, value in depth.items()
+    }
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in labels
+    ) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def exposition():
+    """All metrics in the Prometheus text format"""
+    counters, histograms = merge(read_snapshots())
+    counters.update(email_queue_gauges())
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(
+                    f'{name}{format_labels(labels)} {format_value(value)}'
+                )
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(histogram['buckets'],
+                                    histogram['counts']):
+                cumulative += count
+                bucket_labels = format_labels(labels + (('le', bound),))
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            bucket_labels = format_labels(labels + (('le', '+Inf'),))
+            lines.append(f'{name}_bucket{bucket_labels} {histogram["count"]}')
+            lines.append(f'{name}_sum{format_labels(labels)} '
+                         f'{format_value(histogram["sum"])}')
+            lines.append(f'{name}_count{format_labels(labels)} '
+                         f'{histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def is_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            f'Bearer {token}'.encode()):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network)
+               for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    if not is_allowed(request):
+        return HttpResponse(status=401 if settings.METRICS_TOKEN else 403)
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class MetricsMiddleware:
+    """Count requests by view; must come before RequestTimingMiddleware,
+    whose numbers it reads from the response.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - start)
+        if registry.flush_due():
+            # The file write would stall every request on the event loop
+            await sync_to_async(registry.flush, thread_sensitive=False)()
+        return response
+
+    def record(self, request, response, duration):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        labels = {'view': view, 'method': request.method}
+        registry.inc('api_requests_total',
+                     {**labels, 'status': response.status_code})
+        registry.observe('api_request_duration_seconds', labels, duration)
+        timings = getattr(response, 'timings', None)
+        if timings is not None:
+            registry.inc('api_db_queries_total', labels, timings.queries)
+            registry.inc('api_db_duration_seconds_total', labels,
+                         timings.sql)
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 20:05
+
+from django.db import migrations
+
+from api.search import install_search_index, remove_search_index
+
+
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def remove(apps, schema_editor):
+    remove_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_queued_email'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
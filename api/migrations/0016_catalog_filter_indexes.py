@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_title_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'year'], name='title_category_year_idx'),
+        ),
+        # Reverse (genre, title) index on the auto-created M2M table for
+        # ?genre= filters; the unique constraint covers (title, genre).
+        migrations.RunSQL(
+            'CREATE INDEX api_title_genre_genre_title_idx '
+            'ON api_title_genre (genre_id, title_id)',
+            'DROP INDEX api_title_genre_genre_title_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.shortcuts import get_object_or_404
+
+
+class NestedParentMixin:
+    """Resolve the parent object of a nested route once per request.
+
+    `parent_model` is looked up by the `parent_url_kwarg` URL keyword;
+    the result is memoized on the view instance, which lives for exactly
+    one request.
+    """
+    parent_model = None
+    parent_url_kwarg = None
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(
+                self.parent_model, pk=self.kwargs[self.parent_url_kwarg]
+            )
+        return self._parent
@@ -2,6 +2,7 @@ import datetime
 from django.db import models
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.conf import settings
+from django.utils import timezone
 
 
 class Category(models.Model):
@@ -43,10 +44,28 @@ class Title(models.Model):
     genre = models.ManyToManyField(
          Genre, default=None, related_name='genre', blank=True
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Сумма оценок'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество оценок'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'year'],
+                         name='title_category_year_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -69,6 +88,10 @@ class Review(models.Model):
         verbose_name_plural = 'reviews'
         ordering = ['-pub_date']
         unique_together = ('title', 'author')
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -86,3 +109,30 @@ class Comment(models.Model):
         verbose_name = 'comment'
         verbose_name_plural = 'comments'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+        ]
+
+
+class QueuedEmail(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to = models.EmailField()
+    created = models.DateTimeField(auto_now_add=True)
+    send_after = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = 'queued email'
+        verbose_name_plural = 'queued emails'
+        ordering = ['send_after', 'id']
+        indexes = [
+            models.Index(fields=['sent_at', 'send_after'],
+                         name='queued_email_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+
+def queue_email(subject, body, to):
+    """Store the message for the send_queued_emails worker"""
+    return QueuedEmail.objects.create(subject=subject, body=body, to=to)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** attempts)
+
+
+def claim_due_emails(batch_size):
+    """Lease a batch of due messages to this worker.
+
+    The rows are locked only while their send_after moves past the lease,
+    so other workers skip them and the messages come due again if this
+    worker dies before recording the outcome.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True).filter(
+                sent_at__isnull=True, send_after__lte=now,
+                attempts__lt=settings.EMAIL_QUEUE_MAX_ATTEMPTS,
+            ).order_by('send_after', 'id')[:batch_size]
+        )
+        leased_until = now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE)
+        QueuedEmail.objects.filter(
+            pk__in=[queued.pk for queued in batch]
+        ).update(send_after=leased_until)
+    return batch
+
+
+def record_failure(queued, error):
+    queued.last_error = f'{type(error).__name__}: {error}'
+    queued.send_after = timezone.now() + retry_delay(queued.attempts)
+
+
+def send_queued_emails(batch_size=100):
+    """Send one batch of due messages over a single backend connection.
+
+    Returns the number of sent and failed messages. Failed messages, and
+    the whole batch when the backend cannot be reached, are retried with
+    exponential backoff until EMAIL_QUEUE_MAX_ATTEMPTS.
+    """
+    batch = claim_due_emails(batch_size)
+    if not batch:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for queued in batch:
+            queued.attempts += 1
+            record_failure(queued, error)
+        failed = len(batch)
+    else:
+        try:
+            for queued in batch:
+                message = EmailMessage(
+                    queued.subject, queued.body, to=[queued.to],
+                    connection=connection,
+                )
+                queued.attempts += 1
+                try:
+                    message.send()
+                except Exception as error:
+                    record_failure(queued, error)
+                    failed += 1
+                else:
+                    queued.sent_at = timezone.now()
+                    queued.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+    QueuedEmail.objects.bulk_update(
+        batch, ['attempts', 'sent_at', 'send_after', 'last_error']
+    )
+    return sent, failed
@@ -1,5 +1,243 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
 
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
-class NumberPagination(PageNumberPagination):
-    page_size = 5
\ No newline at end of file
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Page numbers without an unconditional COUNT(*).
+
+    The page is read with one extra row to find out whether a next page
+    exists. `count` is then exact when it is known from the page itself,
+    capped at `max_count` otherwise (`count_is_estimate` is set; past the
+    cap it is the rows served so far plus the next one), and the
+    client chooses another mode with `?count=`:
+
+    * `exact` - plain COUNT(*), as PageNumberPagination does;
+    * `estimate` - planner row estimate on PostgreSQL, capped elsewhere;
+    * `none` - no count at all.
+    """
+    count_query_param = 'count'
+    count_modes = ('capped', 'exact', 'estimate', 'none')
+    count_mode = 'capped'
+    max_count = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message)
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message)
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        if not self.page and self.page_number != 1:
+            raise NotFound(self.invalid_page_message)
+        self.count, self.count_is_estimate = self.get_count(
+            queryset, request, offset + len(self.page)
+        )
+        return self.page
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode in self.count_modes:
+            return mode
+        return self.count_mode
+
+    def get_count(self, queryset, request, seen):
+        mode = self.get_count_mode(request)
+        if mode == 'none':
+            return None, False
+        if mode == 'exact':
+            return queryset.count(), False
+        if not self.has_next:
+            return seen, False
+        if mode == 'estimate':
+            estimate = self.estimate_count(queryset)
+            if estimate is not None:
+                return max(estimate, seen + 1), True
+        if seen >= self.max_count:
+            # Past the cap: count no further than the rows known to exist
+            return seen + 1, True
+        count = queryset[:self.max_count + 1].count()
+        if count > self.max_count:
+            return self.max_count, True
+        return count, False
+
+    def estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get_paginated_response(self, data):
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+            if self.count_is_estimate:
+                response['count_is_estimate'] = True
+        response.update({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+        return Response(response)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.page_query_param, self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+
+class NumberPagination(EstimatedCountPagination):
+    page_size = 5
+
+
+class PubDateCursorPagination(BasePagination):
+    """Keyset pagination on (pub_date, id), newest first.
+
+    The cursor stores the position of the last (or first) row of the page,
+    so the database seeks straight to it through the (parent, pub_date, id)
+    index instead of counting and skipping the previous pages.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # Larger ids do not fit a 64-bit column and overflow in the query
+    max_pk = 2 ** 63 - 1
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        reverse, position = self.decode_cursor(request)
+        if position is not None:
+            pub_date, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                )
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'id')
+        else:
+            queryset = queryset.order_by('-pub_date', '-id')
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            reverse, pub_date, pk = b64decode(
+                encoded.encode('ascii')
+            ).decode('ascii').split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+        if (pub_date is None or reverse not in ('0', '1')
+                or abs(pk) > self.max_pk):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse == '1', (pub_date, pk)
+
+    def get_position(self, obj):
+        # Rows from api.rows.RowListMixin are dicts
+        if isinstance(obj, dict):
+            return obj['pub_date'], obj['id']
+        return obj.pub_date, obj.pk
+
+    def encode_cursor(self, reverse, obj):
+        pub_date, pk = self.get_position(obj)
+        position = f'{int(reverse)}|{pub_date.isoformat()}|{pk}'
+        encoded = b64encode(position.encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """Page numbers by default, keyset pages once `?cursor=` is passed"""
+    cursor_pagination_class = PubDateCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        if cursor_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
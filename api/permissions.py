@@ -7,6 +7,15 @@ from rest_framework.permissions import (
 )
 
 
+def get_role(request):
+    """Role from the token claims, falling back to the user row"""
+    if not request.user.is_authenticated:
+        return None
+    if request.auth is not None and 'role' in request.auth:
+        return request.auth['role']
+    return request.user.role
+
+
 class IsNotAuth(BasePermission):
 
     def has_permission(self, request, view):
@@ -15,30 +24,25 @@ class IsNotAuth(BasePermission):
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        if request.user.is_authenticated:
-            return request.user.role == 'admin'
+        return get_role(request) == 'admin'
 
 
 class IsAdminOrReadOnly(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if request.method in ('DELETE', 'PUT', 'PATCH'):
-            if request.user.is_authenticated:
-                return request.user.role == 'admin'
-        else:
-            return True
+            return get_role(request) == 'admin'
+        return True
 
     def has_permission(self, request, view):
-        if (request.method in SAFE_METHODS
-                or (request.user.is_authenticated
-                    and request.user.role == 'admin')):
-            return True
+        return (request.method in SAFE_METHODS
+                or get_role(request) == 'admin')
 
 
 class IsAuthorOrModeratorOrAdminOrReadOnly(BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return request.method in SAFE_METHODS or (
-                (request.user == obj.author) or (
-                 request.user.role in ('admin', 'moderator'))
+                (request.user.pk == obj.author_id) or (
+                 get_role(request) in ('admin', 'moderator'))
         )
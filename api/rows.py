@@ -0,0 +1,283 @@
+"""Serialize read-only lists from `.values()` rows.
+
+A ModelSerializer builds a model instance for every row and walks its
+fields object by object. `RowSerializer` compiles the serializer's
+readable fields once into (name, getter) pairs over the columns of a
+single `.values()` query, and loads many-to-many fields with one query
+per page, producing the same data as the serializer. Serializers with
+fields it does not know how to read are left to DRF.
+"""
+from contextvars import ContextVar
+from operator import itemgetter
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .timing import TimedSerializerMixin, measure
+
+RELATED_OWNER = 'related_owner'
+
+# Looking up the active timezone costs more than formatting the date, so
+# serialize() does it once per batch for the datetime getters.
+batch_timezone = ContextVar('batch_timezone', default=None)
+
+_compiled = {}
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+def none_safe(getter, to_representation):
+    def get(row):
+        value = getter(row)
+        if value is None:
+            return None
+        return to_representation(value)
+    return get
+
+
+def nested_or_none(pk_column, nested):
+    def get(row):
+        if row[pk_column] is None:
+            return None
+        return nested.to_representation(row)
+    return get
+
+
+def computed(prop, columns, to_representation):
+    """Evaluate a model property over the columns it reads"""
+    names = [column.rsplit('__', 1)[-1] for column in columns]
+
+    def get(row):
+        value = prop.fget(SimpleNamespace(**{
+            name: row[column] for name, column in zip(names, columns)
+        }))
+        if value is None:
+            return None
+        return to_representation(value)
+    return get
+
+
+def iso_datetime(column, field):
+    """DateTimeField.to_representation for aware values in ISO 8601"""
+    def get(row):
+        value = row[column]
+        if value is None:
+            return None
+        tz = batch_timezone.get()
+        if tz is None or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return get
+
+
+def is_plain_datetime(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return (type(field) is serializers.DateTimeField
+            and not hasattr(field, 'timezone')
+            and isinstance(output_format, str)
+            and output_format.lower() == ISO_8601)
+
+
+def placeholder(row):
+    return None
+
+
+class RowSerializer:
+    """Readable fields of `serializer` compiled against `model`.
+
+    Nested serializers on foreign keys read through joins (`prefix` is
+    the lookup path to the related model, `pk_column` its key column).
+    """
+
+    def __init__(self, serializer, model, prefix='', pk_column=None):
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        if type(serializer).to_representation not in (
+                serializers.Serializer.to_representation,
+                TimedSerializerMixin.to_representation):
+            raise UnsupportedField('to_representation')
+        self.model = model
+        self.pk_column = pk_column or model._meta.pk.name
+        self.columns = [self.pk_column]
+        self.fields = []
+        # (path to the containing dict, field name, owner column,
+        # query name, RowSerializer of the related model)
+        self.many = []
+        sources = getattr(getattr(serializer, 'Meta', None),
+                          'sparse_sources', {})
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in sources:
+                self.add_computed(name, field, sources[name], prefix)
+            else:
+                self.add_field(name, field, prefix)
+
+    def add_column(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+
+    def add_computed(self, name, field, columns, prefix):
+        prop = getattr(self.model, field.source, None)
+        if not isinstance(prop, property):
+            raise UnsupportedField(name)
+        columns = [prefix + column for column in columns]
+        for column in columns:
+            self.add_column(column)
+        self.fields.append(
+            (name, computed(prop, columns, field.to_representation))
+        )
+
+    def add_field(self, name, field, prefix):
+        try:
+            model_field = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise UnsupportedField(name)
+        path = prefix + field.source
+        if model_field.many_to_many and isinstance(
+                field, serializers.ListSerializer):
+            child = RowSerializer(field.child, model_field.related_model)
+            self.many.append((
+                (), name, self.pk_column,
+                model_field.related_query_name(), child
+            ))
+            self.fields.append((name, placeholder))
+        elif not model_field.is_relation and is_plain_datetime(field):
+            self.add_column(path)
+            self.fields.append((name, iso_datetime(path, field)))
+        elif not model_field.is_relation:
+            self.add_column(path)
+            self.fields.append((name, none_safe(
+                itemgetter(path), field.to_representation
+            )))
+        elif not (model_field.many_to_one or model_field.one_to_one):
+            raise UnsupportedField(name)
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                raise UnsupportedField(name)
+            self.add_column(path)
+            self.fields.append((name, itemgetter(path)))
+        elif isinstance(field, serializers.SlugRelatedField):
+            column = f'{path}__{field.slug_field}'
+            self.add_column(column)
+            self.fields.append((name, itemgetter(column)))
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = RowSerializer(
+                field, model_field.related_model, f'{path}__', path
+            )
+            for column in nested.columns:
+                self.add_column(column)
+            for many_path, *many in nested.many:
+                self.many.append(((name, *many_path), *many))
+            self.fields.append((name, nested_or_none(path, nested)))
+        else:
+            raise UnsupportedField(name)
+
+    def to_representation(self, row):
+        return {name: getter(row) for name, getter in self.fields}
+
+    def select(self, queryset, *columns):
+        """The queryset as rows with the columns this serializer reads"""
+        return queryset.prefetch_related(None).values(
+            *self.columns, *(column for column in columns
+                             if column not in self.columns)
+        )
+
+    def serialize(self, rows):
+        rows = list(rows)
+        token = batch_timezone.set(
+            timezone.get_current_timezone() if settings.USE_TZ else None
+        )
+        try:
+            data = [self.to_representation(row) for row in rows]
+        finally:
+            batch_timezone.reset(token)
+        for path, name, owner_column, query_name, child in self.many:
+            owners = {row[owner_column] for row in rows} - {None}
+            related = child.load_related(query_name, owners)
+            for row, item in zip(rows, data):
+                for key in path:
+                    item = item[key] if item is not None else None
+                if item is not None:
+                    item[name] = related.get(row[owner_column], [])
+        return data
+
+    def load_related(self, query_name, owners):
+        """Serialized related objects grouped by the owner's key"""
+        if not owners:
+            return {}
+        rows = list(self.model.objects.filter(
+            **{f'{query_name}__in': owners}
+        ).values(*self.columns, **{RELATED_OWNER: F(query_name)}))
+        grouped = {}
+        for row, item in zip(rows, self.serialize(rows)):
+            grouped.setdefault(row[RELATED_OWNER], []).append(item)
+        return grouped
+
+
+def compile_serializer(serializer, model):
+    """Cached RowSerializer for the serializer's fields, None if unsupported"""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    key = (type(serializer), model, tuple(
+        (name, type(field), field.source)
+        for name, field in serializer.fields.items()
+    ))
+    if key not in _compiled:
+        try:
+            _compiled[key] = RowSerializer(serializer, model)
+        except UnsupportedField:
+            _compiled[key] = None
+    return _compiled[key]
+
+
+def ordering_columns(queryset):
+    model = queryset.model
+    columns = []
+    for name in queryset.query.order_by or model._meta.ordering:
+        if not isinstance(name, str):
+            continue
+        name = name.lstrip('-')
+        try:
+            model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        columns.append(name)
+    return columns
+
+
+class RowListMixin:
+    """Serve `list` from `.values()` rows through a RowSerializer.
+
+    Paginators receive dicts instead of model instances; the row keeps
+    the ordering columns, which cursor pagination reads.
+    """
+
+    def get_row_serializer(self, queryset):
+        return compile_serializer(self.get_serializer(), queryset.model)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        row_serializer = self.get_row_serializer(queryset)
+        if row_serializer is None:
+            return super().list(request, *args, **kwargs)
+        rows = row_serializer.select(queryset, *ordering_columns(queryset))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with measure('serialize'):
+                data = row_serializer.serialize(page)
+            return self.get_paginated_response(data)
+        with measure('serialize'):
+            data = row_serializer.serialize(rows)
+        return Response(data)
@@ -0,0 +1,135 @@
+"""Title search backed by a database full-text index.
+
+PostgreSQL uses a GIN index on to_tsvector('simple', name) for ranking
+and a pg_trgm index on UPPER(name) that serves the substring match
+(`icontains`). SQLite uses the FTS5 `api_title_fts` table with the
+trigram tokenizer, kept in sync with api_title by triggers. Other
+databases, and SQLite builds without FTS5, fall back to `icontains`.
+The indexes are created by migration 0015; `manage.py
+rebuild_search_index` recreates the SQLite table and triggers.
+"""
+from django.db import OperationalError, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'api_title_fts'
+# The trigram tokenizer cannot match anything shorter than three characters
+FTS_MIN_LENGTH = 3
+
+SQLITE_SETUP = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, content='api_title', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT "
+    f"ON api_title BEGIN INSERT INTO {FTS_TABLE}(rowid, name) "
+    f"VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE "
+    f"ON api_title BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    f"VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name "
+    f"ON api_title BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    f"VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+SQLITE_TEARDOWN = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+
+POSTGRESQL_SETUP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS api_title_name_fts_idx ON api_title "
+    "USING gin (to_tsvector('simple'::regconfig, COALESCE(name, '')))",
+    "CREATE INDEX IF NOT EXISTS api_title_name_trgm_idx ON api_title "
+    "USING gin (UPPER(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS api_genre_name_trgm_idx ON api_genre "
+    "USING gin (UPPER(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS api_category_name_trgm_idx ON api_category "
+    "USING gin (UPPER(name) gin_trgm_ops)",
+)
+
+POSTGRESQL_TEARDOWN = (
+    "DROP INDEX IF EXISTS api_title_name_fts_idx",
+    "DROP INDEX IF EXISTS api_title_name_trgm_idx",
+    "DROP INDEX IF EXISTS api_genre_name_trgm_idx",
+    "DROP INDEX IF EXISTS api_category_name_trgm_idx",
+)
+
+
+def has_sqlite_fts(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    if not hasattr(connection, 'has_title_fts'):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = %s", [FTS_TABLE]
+            )
+            connection.has_title_fts = cursor.fetchone() is not None
+    return connection.has_title_fts
+
+
+def fts5_phrase(value):
+    return '"' + value.replace('"', '""') + '"'
+
+
+def search_titles(queryset, value):
+    """Filter titles whose name contains `value`, best matches first"""
+    value = value.strip()
+    if not value:
+        return queryset
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector
+        )
+        vector = SearchVector('name', config='simple')
+        query = SearchQuery(value, config='simple')
+        return queryset.annotate(
+            search_vector=vector, search_rank=SearchRank(vector, query)
+        ).filter(
+            Q(search_vector=query) | Q(name__icontains=value)
+        ).order_by('-search_rank', 'id')
+    if len(value) >= FTS_MIN_LENGTH and has_sqlite_fts(connection):
+        match = fts5_phrase(value)
+        return queryset.annotate(search_rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = api_title.id',
+            [match]
+        )).filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        )).order_by('search_rank', 'id')
+    return queryset.filter(name__icontains=value)
+
+
+def install_search_index(connection):
+    statements = {
+        'sqlite': SQLITE_SETUP, 'postgresql': POSTGRESQL_SETUP,
+    }.get(connection.vendor, ())
+    if hasattr(connection, 'has_title_fts'):
+        del connection.has_title_fts
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(statements[0])
+            except OperationalError:
+                # No FTS5 or no trigram tokenizer (SQLite < 3.34)
+                return
+            statements = statements[1:]
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def remove_search_index(connection):
+    statements = {
+        'sqlite': SQLITE_TEARDOWN, 'postgresql': POSTGRESQL_TEARDOWN,
+    }.get(connection.vendor, ())
+    if hasattr(connection, 'has_title_fts'):
+        del connection.has_title_fts
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
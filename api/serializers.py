@@ -1,15 +1,20 @@
+import time
+
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from .fieldsets import SparseFieldsSerializerMixin
+from .timing import TimedSerializerMixin
 from .models import Review, Comment, Title, Genre, Category
 
 User = get_user_model()
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, SparseFieldsSerializerMixin,
+                        serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -21,14 +26,14 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         fields = ('name', 'slug')
         model = Genre
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         fields = ('name', 'slug')
@@ -40,7 +45,8 @@ class RoundingDecimalField(serializers.DecimalField):
         return value
 
 
-class TitlesSerializer(serializers.ModelSerializer):
+class TitlesSerializer(TimedSerializerMixin, SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     genre = GenreSerializer(many=True, read_only=True)
     category = CategorySerializer(read_only=True, many=False)
     rating = RoundingDecimalField(
@@ -53,9 +59,11 @@ class TitlesSerializer(serializers.ModelSerializer):
             'id', 'name', 'year', 'rating', 'description', 'genre', 'category'
         )
         model = Title
+        sparse_sources = {'rating': ('rating_sum', 'rating_count')}
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, SparseFieldsSerializerMixin,
+                       serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
@@ -64,22 +72,24 @@ class ReviewSerializer(serializers.ModelSerializer):
     score = serializers.IntegerField(max_value=10)
 
     def validate(self, attrs):
-        if self.context.get('request').method == 'POST':
-            title_id = self.context.get('title').id
-            reviews = self.context.get('request').user.reviews.all()
-            reviews_id_of_current_author = []
-            for review in reviews:
-                reviews_id_of_current_author.append(review.title.id)
-            if title_id in reviews_id_of_current_author:
+        request = self.context.get('request')
+        if request.method == 'POST':
+            already_reviewed = Review.objects.filter(
+                title=self.context.get('title'), author=request.user
+            ).exists()
+            if already_reviewed:
                 raise serializers.ValidationError('Only one review allowed')
         return attrs
 
     class Meta:
         fields = '__all__'
         model = Review
+        expandable = {
+            'title': serializers.PrimaryKeyRelatedField(read_only=True),
+        }
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         validators=[UniqueValidator(queryset=User.objects.all()), ],
         default=None,
@@ -102,6 +112,11 @@ class ConfirmationCodeSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
+        # Claims let ClaimsJWTAuthentication and the permission classes
+        # work without loading the user.
+        token['username'] = user.username
+        token['role'] = user.role
+        token['iat'] = time.time()
         token = token.access_token
 
         return token
@@ -0,0 +1,154 @@
+from django.db.models import F
+from django.db.models.signals import (
+    pre_save, post_save, post_delete, m2m_changed
+)
+from django.contrib.auth import get_user_model
+from django.dispatch import receiver
+
+from .authentication import CLAIM_FIELDS, forget_user, revoke_user_tokens
+from .cache import bump_versions
+from .models import Category, Comment, Genre, Review, Title
+
+User = get_user_model()
+
+
+def update_title_rating(review, score_delta, count_delta):
+    """Apply a score/count delta to the stored rating of the review's title"""
+    if not score_delta and not count_delta:
+        return
+    Title.objects.filter(pk=review.title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+    )
+    if Review.title.is_cached(review):
+        review.title.rating_sum += score_delta
+        review.title.rating_count += count_delta
+
+
+def score_weight(score):
+    if score is None:
+        return 0, 0
+    return score, 1
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_score(sender, instance, raw=False, **kwargs):
+    instance._previous_score = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_score = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('score', flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def add_review_score(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    score, count = score_weight(instance.score)
+    if not created:
+        previous_score, previous_count = score_weight(
+            getattr(instance, '_previous_score', None)
+        )
+        score -= previous_score
+        count -= previous_count
+    update_title_rating(instance, score, count)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_score(sender, instance, **kwargs):
+    score, count = score_weight(instance.score)
+    update_title_rating(instance, -score, -count)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genres(sender, **kwargs):
+    bump_versions('genres', 'titles', 'titles-detail')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, **kwargs):
+    bump_versions('categories', 'titles', 'titles-detail')
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def invalidate_title(sender, instance, **kwargs):
+    bump_versions('titles', f'titles:{instance.pk}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        bump_versions('titles', 'titles-detail')
+    else:
+        bump_versions('titles', f'titles:{instance.pk}')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_title(sender, instance, **kwargs):
+    bump_versions('titles', f'titles:{instance.title_id}',
+                  f'reviews:{instance.title_id}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_review_comments(sender, instance, **kwargs):
+    bump_versions(f'comments:{instance.review_id}')
+
+
+TOKEN_FIELDS = (*CLAIM_FIELDS, 'is_active')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_authors(sender, instance, raw=False, **kwargs):
+    # Reviews and comments render only the author's username; a deleted
+    # user's reviews and comments go with it and bump their own names.
+    previous = getattr(instance, '_previous_token_fields', None)
+    if raw or previous is None:
+        return
+    if previous[TOKEN_FIELDS.index('username')] != instance.username:
+        bump_versions('usernames')
+
+
+@receiver(pre_save, sender=User)
+def remember_token_fields(sender, instance, raw=False, **kwargs):
+    instance._previous_token_fields = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_token_fields = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(*TOKEN_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def revoke_outdated_tokens(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    previous = getattr(instance, '_previous_token_fields', None)
+    if previous is None:
+        return
+    previous = dict(zip(TOKEN_FIELDS, previous))
+    claims_changed = any(
+        previous[field] != getattr(instance, field) for field in CLAIM_FIELDS
+    )
+    # Activation is no reason to reject the token issued along with it
+    deactivated = previous['is_active'] and not instance.is_active
+    if claims_changed or deactivated:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
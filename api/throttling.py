@@ -0,0 +1,103 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket kept in the shared cache.
+
+    The rate for `scope` comes from DEFAULT_THROTTLE_RATES in the usual
+    `number/period` form: the bucket holds `number` tokens and refills
+    at `number` per `period`, so short bursts pass while the sustained
+    rate is capped. A scope without a configured rate is not throttled.
+    Buckets are keyed by the client IP unless `get_ident_key` says
+    otherwise.
+    """
+    scope = None
+    cache_format = 'throttle:{scope}:{ident}'
+    durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    # A bucket is updated under a cache lock; a request that cannot take
+    # it within lock_attempts * lock_delay seconds is throttled.
+    lock_timeout = 1
+    lock_attempts = 10
+    lock_delay = 0.005
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+    def get_cache_key(self, ident):
+        # Hashed: emails may be longer than or contain characters
+        # not allowed in memcached keys
+        digest = hashlib.sha256(str(ident).encode()).hexdigest()
+        return self.cache_format.format(scope=self.scope, ident=digest)
+
+    def acquire(self, cache, lock_key):
+        for _ in range(self.lock_attempts):
+            if cache.add(lock_key, 1, self.lock_timeout):
+                return True
+            time.sleep(self.lock_delay)
+        return False
+
+    def parse_rate(self, rate):
+        number, period = rate.split('/')
+        return int(number), self.durations[period[0]]
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        ident = self.get_ident_key(request, view)
+        if rate is None or ident is None:
+            return True
+        capacity, period = self.parse_rate(rate)
+        refill = capacity / period
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        key = self.get_cache_key(ident)
+        lock_key = f'{key}:lock'
+        if not self.acquire(cache, lock_key):
+            self.wait_seconds = self.lock_timeout
+            return False
+        try:
+            now = time.time()
+            tokens, updated = cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            if tokens < 1:
+                self.wait_seconds = (1 - tokens) / refill
+                return False
+            cache.set(key, (tokens - 1, now), period)
+            return True
+        finally:
+            cache.delete(lock_key)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class EmailTokenBucketThrottle(TokenBucketThrottle):
+
+    def get_ident_key(self, request, view):
+        email = request.data.get('email')
+        if not email:
+            return None
+        return str(email).strip().lower()
+
+
+class SignupIPThrottle(TokenBucketThrottle):
+    scope = 'auth_email.ip'
+
+
+class SignupEmailThrottle(EmailTokenBucketThrottle):
+    scope = 'auth_email.email'
+
+
+class TokenIPThrottle(TokenBucketThrottle):
+    scope = 'auth_token.ip'
+
+
+class TokenEmailThrottle(EmailTokenBucketThrottle):
+    scope = 'auth_token.email'
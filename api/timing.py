@@ -0,0 +1,178 @@
+"""Per-request SQL and timing instrumentation.
+
+RequestTimingMiddleware counts the queries run on every database
+connection and their total time, collects the spans recorded with
+`measure()` (serialization, rendering) and adds them to the response as
+a `Server-Timing` header (with REQUEST_TIMING_HEADER) and to the
+`api.timing` log as one JSON line.
+Queries are counted by an execute wrapper on every connection that reads
+the request's timings from a context variable, so the queries of views
+run in worker threads under ASGI are counted too.
+Requests slower than REQUEST_TIMING_SLOW_MS or running more than
+REQUEST_TIMING_MAX_QUERIES queries are logged as warnings. Tests can
+read the numbers from `response.timings`.
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('api.timing')
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.spans = {}
+        self.total = 0.0
+        self.active = set()
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - start
+            self.queries += 1
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'sql_ms': round(self.sql * 1000, 2),
+            **{f'{name}_ms': round(seconds * 1000, 2)
+               for name, seconds in self.spans.items()},
+            'total_ms': round(self.total * 1000, 2),
+        }
+
+    def server_timing(self):
+        metrics = [
+            f'db;dur={self.sql * 1000:.2f};desc="{self.queries} queries"'
+        ]
+        metrics.extend(f'{name};dur={seconds * 1000:.2f}'
+                       for name, seconds in self.spans.items())
+        metrics.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def execute_timed(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute(execute, sql, params, many, context)
+
+
+def install_execute_wrapper(sender=None, connection=None, **kwargs):
+    if execute_timed not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_timed)
+
+
+def time_queries():
+    """Count the queries of this thread's connections, including the ones
+    opened before this module was imported
+    """
+    for connection in connections.all():
+        install_execute_wrapper(connection=connection)
+
+
+connection_created.connect(install_execute_wrapper)
+
+
+@contextmanager
+def measure(name):
+    """Add the time spent in the block to the current request's `name` span.
+
+    Nested blocks with the same name are counted once, so serializers can
+    measure themselves without double counting their nested serializers.
+    """
+    timings = current_timings.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+        timings.active.discard(name)
+
+
+class TimedSerializerMixin:
+    """Record the time spent serializing as the `serialize` span"""
+
+    def to_representation(self, instance):
+        with measure('serialize'):
+            return super().to_representation(instance)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Lets Django call this middleware from async code, as with
+            # MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        time_queries()
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - start
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings.total = time.perf_counter() - start
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        response.timings = timings
+        if settings.REQUEST_TIMING_HEADER:
+            response['Server-Timing'] = timings.server_timing()
+        self.log(request, response, timings)
+        return response
+
+    def log(self, request, response, timings):
+        slow = (timings.total * 1000 > settings.REQUEST_TIMING_SLOW_MS
+                or timings.queries > settings.REQUEST_TIMING_MAX_QUERIES)
+        level = logging.WARNING if slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        match = request.resolver_match
+        logger.log(level, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'route': match.route if match else None,
+            'status': response.status_code,
+            **timings.as_dict(),
+            'slow': slow,
+        }))
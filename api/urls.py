@@ -25,7 +25,16 @@ router.register(r'categories', CategoryAPIView, basename='categories')
 router.register(r'users', UserViewSet, basename='users',)
 
 
+# Outside the viewsets' prefixes, where `bulk` would shadow a slug
+bulk_urls = [
+    path('titles/', TitleViewSet.as_bulk_view(), name='titles-bulk'),
+    path('genres/', GenreAPIView.as_bulk_view(), name='genres-bulk'),
+    path('categories/', CategoryAPIView.as_bulk_view(),
+         name='categories-bulk'),
+]
+
 urlpatterns = [
+    path('v1/bulk/', include(bulk_urls)),
     path('v1/', include(router.urls)),
     path('v1/token/', TokenObtainPairView.as_view(),
          name='token_obtain_pair'),
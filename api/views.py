@@ -1,17 +1,23 @@
 from datetime import datetime as dt
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404, get_list_or_404
-from django.core.mail import EmailMessage
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import (
+    api_view, permission_classes, throttle_classes, action
+)
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ModelViewSet, generics
 from rest_framework import mixins, viewsets
-from rest_framework.pagination import PageNumberPagination
 
-from .pagination import NumberPagination
+from .pagination import (
+    NumberPagination, EstimatedCountPagination, PageOrCursorPagination
+)
 from .filters import TitleFilter
 from .models import Review, Title, Genre, Category
 from .serializers import (
@@ -27,53 +33,87 @@ from .permissions import (
     AllowAny,
     IsAuthenticated
 )
+from .asyncviews import AsyncReadMixin
 from .confirmation_code import ConfirmationCodeGenerator
-from django.db.models import Avg
+from .bulk import BulkMixin, BulkUpdateMixin, bulk_create_with_pks
+from .cache import CachedListMixin, CachedRetrieveMixin
+from .conditional import ConditionalGetMixin, ConditionalListMixin
+from .fieldsets import SparseFieldsMixin
+from .mixins import NestedParentMixin
+from .rows import RowListMixin
+from .outbox import queue_email
+from .throttling import (
+    SignupIPThrottle, SignupEmailThrottle, TokenIPThrottle, TokenEmailThrottle
+)
 
 confirmation_code_generator = ConfirmationCodeGenerator()
 User = get_user_model()
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(AsyncReadMixin, ConditionalGetMixin, NestedParentMixin,
+                    SparseFieldsMixin, RowListMixin, ModelViewSet):
     """Create, get, update reviews"""
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    pagination_class = PageOrCursorPagination
     permission_classes = [IsAuthenticatedOrReadOnly,
                           IsAuthorOrModeratorOrAdminOrReadOnly]
+    parent_model = Title
+    parent_url_kwarg = 'title_id'
+    sparse_required_fields = ('title',)
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs['title_id'])
-        serializer.save(author=self.request.user, title=title)
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author=self.request.user, title=self.get_parent()
+                )
+        except IntegrityError:
+            # A concurrent request won the race past the EXISTS check in
+            # ReviewSerializer.validate; unique_together caught it.
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ['Only one review allowed']
+            })
 
     def get_queryset(self):
-        queryset = get_object_or_404(
-            Title, pk=self.kwargs['title_id']
-        ).reviews.all()
-        return queryset
+        queryset = self.get_parent().reviews.select_related(
+            'author', 'title__category'
+        ).prefetch_related('title__genre')
+        return self.get_sparse_queryset(queryset)
+
+    def get_cache_dependencies(self):
+        title_id = self.kwargs['title_id']
+        return (f'reviews:{title_id}', f'titles:{title_id}',
+                'titles-detail', 'usernames')
 
     def get_serializer_context(self):
-        title = get_object_or_404(Title, pk=self.kwargs['title_id'])
         context = super(ReviewViewSet, self).get_serializer_context()
-        context.update({"request": self.request, 'title': title})
+        context.update({"request": self.request, 'title': self.get_parent()})
         return context
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(AsyncReadMixin, ConditionalGetMixin, NestedParentMixin,
+                     SparseFieldsMixin, RowListMixin, ModelViewSet):
     """Create, get, update comments for reviews"""
     serializer_class = CommentSerializer
+    pagination_class = PageOrCursorPagination
     permission_classes = [IsAuthenticatedOrReadOnly,
                           IsAuthorOrModeratorOrAdminOrReadOnly]
+    parent_model = Review
+    parent_url_kwarg = 'review_id'
+    sparse_required_fields = ('review',)
 
     def perform_create(self, serializer):
         serializer.save(
             author=self.request.user,
-            review_id=self.kwargs['review_id'],
+            review=self.get_parent(),
             pub_date=dt.now()
         )
 
     def get_queryset(self):
-        review = get_object_or_404(Review, id=self.kwargs['review_id'])
-        return review.comments.all()
+        return self.get_sparse_queryset(
+            self.get_parent().comments.select_related('author')
+        )
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -86,18 +126,40 @@ class CommentViewSet(ModelViewSet):
             serializer.data, status=status.HTTP_201_CREATED, headers=headers
         )
 
+    def get_cache_dependencies(self):
+        return (f'comments:{self.kwargs["review_id"]}', 'usernames')
+
     def check_exist(self):
-        get_object_or_404(Review, id=self.kwargs['review_id'])
+        self.get_parent()
+
 
+def as_slug_list(value):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list) and all(
+            isinstance(slug, str) for slug in value):
+        return value
+    return None
 
-class TitleViewSet(ModelViewSet):
-    queryset = Title.objects.all().annotate(rating=Avg('reviews__score'))
+
+class TitleViewSet(AsyncReadMixin, ConditionalGetMixin, CachedRetrieveMixin,
+                   BulkUpdateMixin, SparseFieldsMixin, RowListMixin,
+                   ModelViewSet):
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
+    cache_namespace = 'titles'
+    bulk_lookup_field = 'id'
+    bulk_cache_namespaces = ('titles', 'titles-detail')
     serializer_class = TitlesSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = EstimatedCountPagination
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitleFilter
 
+    def get_queryset(self):
+        return self.get_sparse_queryset(super().get_queryset())
+
     def perform_create(self, serializer):
         slug_genre = self.request.data.get('genre')
         if isinstance(slug_genre, str):
@@ -123,13 +185,85 @@ class TitleViewSet(ModelViewSet):
         else:
             serializer.save()
 
+    def resolve_bulk_relations(self, items, errors):
+        """Look up the genre and category slugs of the whole batch at once"""
+        items = [item if isinstance(item, dict) else {} for item in items]
+        genre_slugs, category_slugs = set(), set()
+        for item in items:
+            genre_slugs.update(as_slug_list(item.get('genre')) or ())
+            if isinstance(item.get('category'), str):
+                category_slugs.add(item['category'])
+        genres = Genre.objects.in_bulk(genre_slugs, field_name='slug')
+        categories = Category.objects.in_bulk(
+            category_slugs, field_name='slug'
+        )
+        relations = []
+        for item, item_errors in zip(items, errors):
+            extra = {}
+            if 'category' in item:
+                category = categories.get(item['category']) if isinstance(
+                    item['category'], str) else None
+                if category is None:
+                    item_errors['category'] = ['Category not found']
+                extra['category'] = category
+            if 'genre' in item:
+                slugs = as_slug_list(item['genre'])
+                if slugs is None:
+                    item_errors['genre'] = ['Expected a list of slugs']
+                elif not set(slugs) <= genres.keys():
+                    item_errors['genre'] = ['Genre not found']
+                else:
+                    extra['genre'] = [genres[slug] for slug in slugs]
+            relations.append(extra)
+        return relations
+
+    def set_bulk_genres(self, titles, relations, replace=True):
+        through = Title.genre.through
+        changed = [(title, extra.pop('genre'))
+                   for title, extra in zip(titles, relations)
+                   if 'genre' in extra]
+        if not changed:
+            return
+        if replace:
+            through.objects.filter(
+                title_id__in=[title.pk for title, _ in changed]
+            ).delete()
+        through.objects.bulk_create(
+            through(title_id=title.pk, genre_id=genre.pk)
+            for title, genres in changed for genre in set(genres)
+        )
+
+    def perform_bulk_create(self, validated_data, relations):
+        titles = bulk_create_with_pks(Title, [
+            Title(**attrs, category=extra.get('category'))
+            for attrs, extra in zip(validated_data, relations)
+        ])
+        self.set_bulk_genres(titles, relations, replace=False)
+        return titles
 
-class GenreAPIView(mixins.CreateModelMixin,
+    def perform_bulk_update(self, instances, validated_data, relations):
+        self.set_bulk_genres(instances, relations)
+        return super().perform_bulk_update(
+            instances, validated_data, relations
+        )
+
+    def get_bulk_result(self, objs):
+        titles = self.get_queryset().in_bulk([obj.pk for obj in objs])
+        return [titles[obj.pk] for obj in objs]
+
+
+class GenreAPIView(ConditionalListMixin,
+                   CachedListMixin,
+                   BulkMixin,
+                   RowListMixin,
+                   mixins.CreateModelMixin,
                    mixins.ListModelMixin,
                    mixins.DestroyModelMixin,
                    viewsets.GenericViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    cache_namespace = 'genres'
+    bulk_cache_namespaces = ('genres',)
     pagination_class = NumberPagination
     lookup_field = 'slug'
     permission_classes = [IsAdminOrReadOnly]
@@ -137,12 +271,18 @@ class GenreAPIView(mixins.CreateModelMixin,
     search_fields = ['name']
 
 
-class CategoryAPIView(mixins.CreateModelMixin,
+class CategoryAPIView(ConditionalListMixin,
+                      CachedListMixin,
+                      BulkMixin,
+                      RowListMixin,
+                      mixins.CreateModelMixin,
                       mixins.ListModelMixin,
                       mixins.DestroyModelMixin,
                       viewsets.GenericViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_namespace = 'categories'
+    bulk_cache_namespaces = ('categories',)
     pagination_class = NumberPagination
     lookup_field = 'slug'
     permission_classes = [IsAdminOrReadOnly]
@@ -152,21 +292,30 @@ class CategoryAPIView(mixins.CreateModelMixin,
 
 @api_view(http_method_names=['POST'])
 @permission_classes((IsNotAuth, ))
+@throttle_classes((SignupIPThrottle, SignupEmailThrottle))
 def send_email(request):
+    user = User.objects.filter(
+        email=request.data.get('email'), is_active=True
+    ).first()
+    if user is not None:
+        # An existing user logs in again, e.g. after a username or role
+        # change revoked their tokens; the code only goes to the mailbox.
+        confirmation_code = confirmation_code_generator.make_login_code(user)
+        queue_email('Log in to YaMDb',
+                    f"Hello, your confirmation_code: {confirmation_code}",
+                    user.email)
+        return Response({'email': user.email}, status=status.HTTP_200_OK)
     serializer = UserSerializer(data=request.data)
     if serializer.is_valid():
-        user = User.objects.create(email=request.data.get('email'))
-        user.is_active = False
-        user.set_unusable_password()
-        user.save()
-        confirmation_code = confirmation_code_generator.make_token(
-            user)
+        # Nothing is written for the user until the code comes back to
+        # send_JWT: the pending signup lives in the signed code itself.
+        to_email = str(request.data.get('email'))
+        confirmation_code = confirmation_code_generator.make_signup_code(
+            to_email)
         mail_subject = 'Activate your account.'
         message = (f"Hello, your confirmation_code: "
                    f"{confirmation_code}")
-        to_email = str(request.data.get('email'))
-        email = EmailMessage(mail_subject, message, to=[to_email])
-        email.send()
+        queue_email(mail_subject, message, to_email)
         return Response({'email': serializer.data['email'],
                          'confirmation code': str(confirmation_code)},
                                 status=status.HTTP_200_OK)
@@ -175,21 +324,56 @@ def send_email(request):
                         status=status.HTTP_400_BAD_REQUEST)
 
 
+def activate_legacy_user(user, confirmation_code):
+    """Accept codes issued before signups stopped creating inactive users"""
+    if user.is_active or not confirmation_code_generator.check_token(
+            user, confirmation_code):
+        return False
+    user.is_active = True
+    user.save()
+    return True
+
+
+def log_in_user(user, confirmation_code):
+    """Accept a login code of an active user, once"""
+    if not confirmation_code_generator.check_login_code(
+            user, confirmation_code):
+        return False
+    last_login = timezone.now()
+    # Conditional on the old value, so concurrent requests spend it once
+    spent = User.objects.filter(
+        pk=user.pk, last_login=user.last_login
+    ).update(last_login=last_login)
+    user.last_login = last_login
+    return bool(spent)
+
+
 @api_view(http_method_names=['POST'])
 @permission_classes((AllowAny, ))
+@throttle_classes((TokenIPThrottle, TokenEmailThrottle))
 def send_JWT(request):
-    user = User.objects.get(email=request.data.get('email'))
-    if confirmation_code_generator.check_token(user,
-                                               request.data.get(
-                                               'confirmation_code')):
-        user.is_active = True
-        user.save()
-        data = {
-            'token': str(ConfirmationCodeSerializer.get_token(user))
-        }
-        serializer = TokenSerializer(data)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    return Response(status=status.HTTP_400_BAD_REQUEST)
+    email = request.data.get('email')
+    confirmation_code = request.data.get('confirmation_code')
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        if not confirmation_code_generator.check_signup_code(
+                email, confirmation_code):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        user = User(email=email)
+        user.set_unusable_password()
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+    elif not (activate_legacy_user(user, confirmation_code)
+              or log_in_user(user, confirmation_code)):
+        return Response(status=status.HTTP_400_BAD_REQUEST)
+    data = {
+        'token': str(ConfirmationCodeSerializer.get_token(user))
+    }
+    serializer = TokenSerializer(data)
+    return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 class UserViewSet(viewsets.ViewSetMixin,
@@ -199,7 +383,7 @@ class UserViewSet(viewsets.ViewSetMixin,
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
-    pagination_class = PageNumberPagination
+    pagination_class = EstimatedCountPagination
 
     def get_object(self):
         user = get_object_or_404(
@@ -211,10 +395,11 @@ class UserViewSet(viewsets.ViewSetMixin,
             detail=False,
             permission_classes=[IsAuthenticated])
     def me(self, request, *args, **kwargs):
-        user = self.request.user
+        # request.user is a cached snapshot, read the full row once here
+        user = get_object_or_404(User, pk=request.user.pk)
         if request.method == 'PATCH':
             if request.data.get('password'):
-                request.user.set_password(request.data.get('password'))
+                user.set_password(request.data.get('password'))
             kwargs['partial'] = True
             partial = kwargs.pop('partial', False)
             serializer = self.get_serializer(user, data=request.data,
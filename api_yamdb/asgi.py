@@ -2,6 +2,9 @@
 ASGI config for YaMDb project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with uvicorn, or with gunicorn and uvicorn workers:
+
+    gunicorn api_yamdb.asgi:application -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -12,5 +15,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
 application = get_asgi_application()
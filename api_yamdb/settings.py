@@ -39,12 +39,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'users',
-    'api',
+    'api.apps.ApiConfig',
     'rest_framework',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    'api.timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -97,6 +99,19 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+API_CACHE_ALIAS = 'default'
+
+API_CACHE_TIMEOUT = 60 * 5
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -139,21 +154,46 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 
 AUTH_USER_MODEL = 'users.User'
 
+# The tables were created with 32-bit ids before Django 3.2
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.ClaimsJWTAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.PageNumberPagination',
 
     'PAGE_SIZE': 10,
+
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_email.ip': '20/hour',
+        'auth_email.email': '3/hour',
+        'auth_token.ip': '60/hour',
+        'auth_token.email': '10/hour',
+    },
 }
 
+THROTTLE_CACHE_ALIAS = 'default'
+
+AUTH_USER_CACHE_ALIAS = 'default'
+
+AUTH_USER_CACHE_TIMEOUT = 60 * 5
+
+# Callable deciding whether a token with role/username claims is revoked;
+# None trusts the claims until the token expires.
+JWT_REVOCATION_CHECK = 'api.authentication.is_token_revoked'
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=1440),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -180,6 +220,66 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
     }
 
+# Lifetime of the signup confirmation code, in seconds
+CONFIRMATION_CODE_TIMEOUT = 60 * 60 * 24
+
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+
+# Queued emails are sent by `manage.py send_queued_emails`; a failed message
+# is retried after EMAIL_QUEUE_RETRY_DELAY * 2 ** attempts seconds.
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+
+EMAIL_QUEUE_RETRY_DELAY = 60
+
+# Seconds a worker holds the messages it took; they are picked up again
+# after that if it died before recording the outcome.
+EMAIL_QUEUE_LEASE = 60 * 5
+
+# api.timing.RequestTimingMiddleware: a warning in the `api.timing` log
+# for requests over these limits (set REQUEST_TIMING_LOG_LEVEL=INFO to log
+# every request), and a Server-Timing header on every response. The header
+# shows SQL counts and timings to any client, so outside DEBUG it is only
+# sent with REQUEST_TIMING_HEADER=1.
+REQUEST_TIMING_HEADER = os.environ.get(
+    'REQUEST_TIMING_HEADER', '1' if DEBUG else '0'
+) == '1'
+
+REQUEST_TIMING_SLOW_MS = 500
+
+REQUEST_TIMING_MAX_QUERIES = 20
+
+# Per-process metric files for /metrics; set it (to a directory shared by
+# the workers) when gunicorn runs more than one worker.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+
+METRICS_FLUSH_INTERVAL = 1.0
+
+# /metrics answers requests with `Authorization: Bearer <METRICS_TOKEN>`
+# or from these networks (comma-separated CIDRs); nobody else by default.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+METRICS_ALLOWED_NETWORKS = [
+    network.strip() for network in os.environ.get(
+        'METRICS_ALLOWED_NETWORKS', ''
+    ).split(',') if network.strip()
+]
+
+# Serve reads of titles, reviews and comments from async views. Set by
+# api_yamdb/asgi.py; under WSGI the sync views are cheaper.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_TIMING_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
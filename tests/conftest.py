@@ -1,4 +1,12 @@
+import pytest
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
-    # 'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
@@ -0,0 +1,52 @@
+import pytest
+
+
+@pytest.fixture
+def catalog(admin, django_user_model):
+    """Catalog big enough to expose per-object queries in list endpoints"""
+    from api.models import Category, Comment, Genre, Review, Title
+
+    Category.objects.bulk_create(
+        Category(name=f'Категория {number}', slug=f'category-{number}')
+        for number in range(3)
+    )
+    categories = list(Category.objects.order_by('id'))
+    Genre.objects.bulk_create(
+        Genre(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(5)
+    )
+    genres = list(Genre.objects.order_by('id'))
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'reviewer{number}',
+                          email=f'reviewer{number}@yamdb.fake')
+        for number in range(12)
+    )
+    authors = list(django_user_model.objects.filter(
+        username__startswith='reviewer'
+    ))
+    Title.objects.bulk_create(
+        Title(name=f'Произведение {number}', year=2000 + number,
+              category=categories[number % len(categories)])
+        for number in range(15)
+    )
+    titles = list(Title.objects.order_by('id'))
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title_id=title.id, genre_id=genre.id)
+        for title in titles for genre in genres[:3]
+    )
+    Review.objects.bulk_create(
+        Review(title=titles[0], author=author, text='Отзыв', score=7)
+        for author in authors
+    )
+    review = Review.objects.filter(title=titles[0]).first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=author, text='Комментарий')
+        for author in authors
+    )
+    return {
+        'title': titles[0],
+        'review': review,
+        'comment': review.comments.first(),
+        'genres': genres,
+        'categories': categories,
+    }
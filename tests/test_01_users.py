@@ -287,3 +287,72 @@ class Test01UserAPI:
             'Проверьте, что при PATCH запросе `/api/v1/users/me/` с токеном авторизации возвращается статус 200'
         assert test_moderator.first_name == 'NewTest', \
             'Проверьте, что при PATCH запросе `/api/v1/users/me/` изменяете данные'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_12_signup_writes_user_once(self, client, settings):
+        email = 'signup@yamdb.fake'
+        response = client.post('/api/v1/auth/email/', data={'email': email})
+        assert response.status_code == 200
+        assert not get_user_model().objects.filter(email=email).exists(), \
+            'Проверьте, что POST `/api/v1/auth/email/` не создаёт пользователя до подтверждения кода'
+        code = response.json()['confirmation code']
+
+        response = client.post('/api/v1/auth/token/', data={'email': 'other@yamdb.fake', 'confirmation_code': code})
+        assert response.status_code == 400, \
+            'Проверьте, что код подтверждения нельзя использовать для другого email'
+        response = client.post('/api/v1/auth/token/', data={'email': email, 'confirmation_code': code})
+        assert response.status_code == 200 and response.json().get('token')
+        user = get_user_model().objects.get(email=email)
+        assert user.is_active and not user.has_usable_password()
+        response = client.post('/api/v1/auth/token/', data={'email': email, 'confirmation_code': code})
+        assert response.status_code == 400, \
+            'Проверьте, что код подтверждения нельзя использовать повторно'
+
+        settings.CONFIRMATION_CODE_TIMEOUT = -1
+        code = client.post('/api/v1/auth/email/', data={'email': 'late@yamdb.fake'}).json()['confirmation code']
+        response = client.post('/api/v1/auth/token/', data={'email': 'late@yamdb.fake', 'confirmation_code': code})
+        assert response.status_code == 400, 'Проверьте, что просроченный код подтверждения не принимается'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_13_token_after_activation_and_claim_change(self, client):
+        from rest_framework.test import APIClient
+        from api.models import QueuedEmail
+        from api.views import confirmation_code_generator
+
+        user = get_user_model().objects.create(username='legacy', email='legacy@yamdb.fake', is_active=False)
+        code = confirmation_code_generator.make_token(user)
+        response = client.post('/api/v1/auth/token/', data={'email': user.email, 'confirmation_code': code})
+        assert response.status_code == 200
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+        response = api_client.get('/api/v1/users/me/')
+        assert response.status_code == 200, \
+            'Проверьте, что токен, выданный при активации пользователя, не отзывается этой активацией'
+
+        response = api_client.patch('/api/v1/users/me/', data={'username': 'renamed'})
+        assert response.status_code == 200
+        assert api_client.get('/api/v1/users/me/').status_code == 401, \
+            'Проверьте, что смена username отзывает выданные токены'
+
+        response = client.post('/api/v1/auth/email/', data={'email': user.email})
+        assert response.status_code == 200, \
+            'Проверьте, что существующий пользователь может снова запросить код подтверждения'
+        assert 'confirmation code' not in response.json(), \
+            'Проверьте, что код входа существующего пользователя отправляется только на почту'
+        code = QueuedEmail.objects.filter(to=user.email).latest('pk').body.split()[-1]
+        response = client.post('/api/v1/auth/token/', data={'email': user.email, 'confirmation_code': code})
+        assert response.status_code == 200
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+        response = api_client.get('/api/v1/users/me/')
+        assert response.status_code == 200 and response.json()['username'] == 'renamed', \
+            'Проверьте, что новый токен принимается сразу после отзыва старых'
+        response = client.post('/api/v1/auth/token/', data={'email': user.email, 'confirmation_code': code})
+        assert response.status_code == 400, 'Проверьте, что код входа нельзя использовать повторно'
+
+    def test_14_revocation_needs_shared_cache(self, settings):
+        from api.checks import check_token_revocation_cache
+
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        assert [error.id for error in check_token_revocation_cache(None)] == ['api.E001']
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache'}}
+        assert check_token_revocation_cache(None) == []
@@ -194,3 +194,109 @@ class Test04TitleAPI:
         user, moderator = create_users_api(user_client)
         self.check_permissions(user, 'обычного пользователя', titles, categories, genres)
         self.check_permissions(moderator, 'модератора', titles, categories, genres)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_titles_cache_invalidation(self, client, user_client, admin):
+        titles, categories, genres = create_titles(user_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        assert client.get(url).json()['rating'] is None
+        assert client.get('/api/v1/genres/').json()['count'] == 3
+
+        user_client.post(f'{url}reviews/', data={'text': 'Отзыв', 'score': 8})
+        assert client.get(url).json()['rating'] == 8, \
+            'Проверьте, что после добавления отзыва GET `/api/v1/titles/{title_id}/` не возвращает устаревший рейтинг'
+        user_client.patch(url, data={'name': 'Новое название'})
+        names = [title['name'] for title in client.get('/api/v1/titles/').json()['results']]
+        assert 'Новое название' in names, \
+            'Проверьте, что после изменения произведения GET `/api/v1/titles/` не возвращает устаревшие данные'
+
+        user_client.delete(f'/api/v1/genres/{genres[0]["slug"]}/')
+        assert client.get('/api/v1/genres/').json()['count'] == 2
+        assert genres[0] not in client.get(url).json()['genre'], \
+            'Проверьте, что после удаления жанра GET `/api/v1/titles/{title_id}/` не возвращает устаревшие данные'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05a_titles_cache_bumped_on_commit(self):
+        from django.db import transaction
+        from api.cache import bump_versions, get_versions
+
+        version = get_versions(['titles'])
+        with transaction.atomic():
+            bump_versions('titles')
+            assert get_versions(['titles']) == version, \
+                'Проверьте, что версия кэша не меняется до фиксации транзакции: ' \
+                'иначе параллельный запрос закэширует старые данные под новой версией'
+        assert get_versions(['titles']) != version
+        version = get_versions(['titles'])
+        with pytest.raises(ValueError), transaction.atomic():
+            bump_versions('titles')
+            raise ValueError
+        assert get_versions(['titles']) == version
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05b_titles_cache_versions_expire(self, client, monkeypatch):
+        import time
+        from api.cache import get_cache, modified_key, version_key, version_timeout
+
+        assert client.get('/api/v1/titles/999999/').status_code == 404
+        keys = [version_key('titles:999999'), modified_key('titles:999999')]
+        assert all(get_cache().get(key) is not None for key in keys)
+        now = time.time()
+        monkeypatch.setattr('django.core.cache.backends.locmem.time.time',
+                            lambda: now + version_timeout() + 1)
+        assert all(get_cache().get(key) is None for key in keys), \
+            'Проверьте, что версии кэша для несуществующих произведений не хранятся вечно'
+
+    def test_05c_titles_cache_needs_shared_cache(self, settings):
+        from api.checks import check_response_cache
+
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        assert [error.id for error in check_response_cache(None)] == ['api.E002'], \
+            'Проверьте, что `check --deploy` сообщает о кэше ответов, локальном для процесса'
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache'}}
+        assert check_response_cache(None) == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_titles_name_search(self, client, user_client):
+        from django.db import connection
+        from api.search import has_sqlite_fts
+
+        titles, categories, genres = create_titles(user_client)
+        user_client.post('/api/v1/titles/', data={
+            'name': 'Поворот', 'year': 2020, 'genre': [genres[1]['slug']], 'category': categories[1]['slug']
+        })
+        if connection.vendor == 'sqlite':
+            assert has_sqlite_fts(connection), 'Проверьте, что миграции создают таблицу полнотекстового поиска'
+
+        def names(query):
+            response = client.get('/api/v1/titles/', {'name': query})
+            assert response.status_code == 200
+            return [title['name'] for title in response.json()['results']]
+
+        assert sorted(names('ворот')) == ['Поворот', 'Поворот туда'], \
+            'Проверьте, что `name` ищет по подстроке названия'
+        assert sorted(names('ПОВОРОТ')) == ['Поворот', 'Поворот туда'], \
+            'Проверьте, что поиск по `name` не зависит от регистра'
+        assert names('Пр') == ['Проект']
+        assert names('"туда') == []
+
+        user_client.patch(f'/api/v1/titles/{titles[1]["id"]}/', data={'name': 'Новый проект'})
+        assert names('Новый') == ['Новый проект'], \
+            'Проверьте, что поисковый индекс обновляется при изменении названия'
+        user_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert names('туда') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_titles_sparse_fields(self, client, user_client):
+        titles, categories, genres = create_titles(user_client)
+        response = client.get('/api/v1/titles/?fields=id,name,rating')
+        assert response.status_code == 200
+        assert set(response.json()['results'][0]) == {'id', 'name', 'rating'}, \
+            'Проверьте, что `?fields=` оставляет в ответе `/api/v1/titles/` только перечисленные поля'
+        response = client.get(f'/api/v1/titles/{titles[0]["id"]}/?fields=genre,category')
+        data = response.json()
+        assert set(data) == {'genre', 'category'}
+        assert data['category']['slug'] == titles[0]['category']
+        response = client.get('/api/v1/titles/?fields=id,secret')
+        assert response.status_code == 400, \
+            'Проверьте, что `?fields=` с неизвестным полем возвращает статус 400'
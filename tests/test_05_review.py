@@ -242,3 +242,79 @@ class Test05ReviewAPI:
             f'Проверьте, что при DELETE запросе `/api/v1/titles/{{title_id}}/reviews/{{review_id}}/` ' \
             f'без токена авторизации возвращается статус 401'
         self.check_permissions(user, 'обычного пользователя', reviews, titles)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_reviews_conditional_get(self, client, user_client, admin, django_assert_num_queries, monkeypatch):
+        import time
+
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        assert response['ETag'] and not response.has_header('Last-Modified'), \
+            'Проверьте, что `Last-Modified` не отправляется, пока не закончилась секунда последнего изменения'
+        now = time.time()
+        monkeypatch.setattr('api.conditional.time.time', lambda: now + 1)
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag and response.has_header('Last-Modified'), \
+            'Проверьте, что GET `/api/v1/titles/{title_id}/reviews/` возвращает заголовки `ETag` и `Last-Modified`'
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, \
+            'Проверьте, что GET `/api/v1/titles/{title_id}/reviews/` с актуальным `If-None-Match` возвращает 304'
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304
+
+        user_client.patch(f'{url}{reviews[0]["id"]}/', data={'text': 'Новый текст'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, \
+            'Проверьте, что после изменения отзыва GET `/api/v1/titles/{title_id}/reviews/` возвращает 200'
+        assert response['ETag'] != etag
+
+        comments_url = f'{url}{reviews[0]["id"]}/comments/'
+        etag = client.get(comments_url)['ETag']
+        assert client.get(comments_url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        auth_client(user).post(comments_url, data={'text': 'Комментарий'})
+        assert client.get(comments_url, HTTP_IF_NONE_MATCH=etag).status_code == 200, \
+            'Проверьте, что после добавления комментария GET `.../comments/` возвращает 200'
+
+        etag = client.get(comments_url)['ETag']
+        client.post('/api/v1/auth/token/', data={
+            'email': 'new@yamdb.fake',
+            'confirmation_code': client.post('/api/v1/auth/email/', data={'email': 'new@yamdb.fake'}).json()['confirmation code'],
+        })
+        assert client.get(comments_url, HTTP_IF_NONE_MATCH=etag).status_code == 304, \
+            'Проверьте, что регистрация пользователя не сбрасывает ETag отзывов и комментариев'
+        user_client.patch(f'/api/v1/users/{user.username}/', data={'username': 'renamed'})
+        assert client.get(comments_url, HTTP_IF_NONE_MATCH=etag).status_code == 200, \
+            'Проверьте, что смена username автора сбрасывает ETag комментариев'
+
+        response = client.get(f'{url}{reviews[0]["id"]}/', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 304
+        missing_url = f'/api/v1/titles/{titles[0]["id"] + 100}/reviews/'
+        assert client.get(missing_url, HTTP_IF_NONE_MATCH='*').status_code == 404, \
+            'Проверьте, что `If-None-Match: *` не возвращает 304 для несуществующего произведения'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_reviews_sparse_fields(self, client, catalog, django_assert_num_queries):
+        url = f'/api/v1/titles/{catalog["title"].id}/reviews/'
+        # title and one page of reviews: cursor pages have no COUNT, and
+        # neither the author nor the title are joined
+        with django_assert_num_queries(2):
+            response = client.get(f'{url}?fields=id,text,score&cursor=')
+        results = response.json()['results']
+        assert set(results[0]) == {'id', 'text', 'score'}, \
+            'Проверьте, что `?fields=` оставляет в отзывах только перечисленные поля'
+        response = client.get(f'{url}?expand=')
+        review = response.json()['results'][0]
+        assert review['title'] == catalog['title'].id, \
+            'Проверьте, что с пустым `?expand=` произведение в отзыве возвращается как id'
+        assert set(review) == {'id', 'author', 'title', 'score', 'text', 'pub_date'}
+        response = client.get(f'{url}?fields=id,title&expand=title')
+        assert response.json()['results'][0]['title']['name'] == catalog['title'].name, \
+            'Проверьте, что `?expand=title` встраивает произведение целиком'
+        assert client.get(f'{url}?expand=author').status_code == 400
+
+        response = client.get(f'{url}{catalog["review"].id}/comments/?fields=id,author')
+        assert set(response.json()['results'][0]) == {'id', 'author'}, \
+            'Проверьте, что `?fields=` работает для комментариев'
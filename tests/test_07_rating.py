@@ -0,0 +1,39 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.models import Title
+from .common import auth_client, create_reviews
+
+
+class Test07TitleRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_follows_reviews(self, user_client, admin):
+        reviews, titles, user, moderator = create_reviews(user_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (12, 3), \
+            'Проверьте, что при создании отзыва обновляется сохранённый рейтинг произведения'
+
+        user_client.patch(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/', data={'score': 8})
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (15, 3), \
+            'Проверьте, что при изменении оценки обновляется сохранённый рейтинг произведения'
+
+        auth_client(moderator).delete(f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[1]["id"]}/')
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (12, 2), \
+            'Проверьте, что при удалении отзыва обновляется сохранённый рейтинг произведения'
+        response = user_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.json().get('rating') == 6
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_ratings(self, user_client, admin):
+        _, titles, _, _ = create_reviews(user_client, admin)
+        Title.objects.update(rating_sum=0, rating_count=0)
+        call_command('rebuild_ratings', stdout=StringIO())
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.rating_count) == (12, 3), \
+            'Проверьте, что команда `rebuild_ratings` пересчитывает рейтинг'
+        assert Title.objects.get(pk=titles[1]['id']).rating is None
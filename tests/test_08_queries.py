@@ -0,0 +1,156 @@
+import time
+
+import pytest
+
+from .common import create_reviews, create_titles
+
+MAX_REQUEST_SECONDS = 1.0
+
+# (url, client fixture, max queries). Authenticated requests include one
+# query for the JWT user lookup, which is cached for the following ones.
+READ_ENDPOINTS = [
+    ('/api/v1/titles/', 'client', 3),
+    ('/api/v1/titles/?genre=genre-0&category=category-0', 'client', 3),
+    ('/api/v1/titles/{title}/', 'client', 2),
+    ('/api/v1/titles/{title}/reviews/', 'client', 4),
+    ('/api/v1/titles/{title}/reviews/{review}/', 'client', 3),
+    ('/api/v1/titles/{title}/reviews/{review}/comments/', 'client', 3),
+    ('/api/v1/titles/{title}/reviews/{review}/comments/{comment}/', 'client', 2),
+    ('/api/v1/genres/', 'client', 1),
+    ('/api/v1/categories/', 'client', 1),
+    ('/api/v1/users/', 'user_client', 3),
+    ('/api/v1/users/reviewer1/', 'user_client', 2),
+    ('/api/v1/users/me/', 'user_client', 2),
+]
+
+
+def timed(request, *args, **kwargs):
+    start = time.perf_counter()
+    response = request(*args, **kwargs)
+    return response, time.perf_counter() - start
+
+
+class Test08Queries:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_queries(self, client, user_client, django_assert_num_queries):
+        titles, categories, genres = create_titles(user_client)
+        for number in range(10):
+            user_client.post('/api/v1/titles/', data={
+                'name': f'Произведение {number}', 'year': 2000,
+                'genre': [genre['slug'] for genre in genres],
+                'category': categories[0]['slug']
+            })
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert len(response.json()['results']) == 10
+        with django_assert_num_queries(2):
+            client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_queries(self, client, user_client, admin, django_assert_num_queries):
+        reviews, titles, _, _ = create_reviews(user_client, admin)
+        with django_assert_num_queries(4):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/reviews/')
+        assert len(response.json()['results']) == len(reviews)
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url, client_name, max_queries', READ_ENDPOINTS)
+    def test_03_read_endpoints(self, request, catalog, django_assert_max_num_queries,
+                               url, client_name, max_queries):
+        url = url.format(title=catalog['title'].id, review=catalog['review'].id,
+                         comment=catalog['comment'].id)
+        api_client = request.getfixturevalue(client_name)
+        with django_assert_max_num_queries(max_queries):
+            response, elapsed = timed(api_client.get, url)
+        assert response.status_code == 200, f'Проверьте, что GET `{url}` возвращает статус 200'
+        assert elapsed < MAX_REQUEST_SECONDS, \
+            f'GET `{url}` выполнялся {elapsed:.3f} с, допустимо не более {MAX_REQUEST_SECONDS} с'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_write_endpoints(self, user_client, catalog, django_assert_max_num_queries):
+        title = catalog['title']
+        review = catalog['review']
+        requests = [
+            ('/api/v1/genres/', {'name': 'Новый жанр', 'slug': 'new-genre'}, 3),
+            ('/api/v1/categories/', {'name': 'Новая категория', 'slug': 'new-category'}, 3),
+            ('/api/v1/titles/', {'name': 'Новое', 'year': 2001, 'genre': ['genre-0', 'genre-1'],
+                                 'category': 'category-0'}, 9),
+            (f'/api/v1/titles/{title.id + 1}/reviews/', {'text': 'Отзыв', 'score': 5}, 8),
+            (f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/', {'text': 'Комментарий'}, 3),
+        ]
+        for url, data, max_queries in requests:
+            with django_assert_max_num_queries(max_queries):
+                response, elapsed = timed(user_client.post, url, data=data)
+            assert response.status_code == 201, f'Проверьте, что POST `{url}` возвращает статус 201'
+            assert elapsed < MAX_REQUEST_SECONDS
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_auth_endpoints(self, client, django_assert_max_num_queries):
+        email = 'new_user@yamdb.fake'
+        with django_assert_max_num_queries(3):
+            response, elapsed = timed(client.post, '/api/v1/auth/email/', data={'email': email})
+        assert response.status_code == 200
+        assert elapsed < MAX_REQUEST_SECONDS
+        code = response.json()['confirmation code']
+        with django_assert_max_num_queries(3):
+            response, elapsed = timed(client.post, '/api/v1/auth/token/',
+                                      data={'email': email, 'confirmation_code': code})
+        assert response.status_code == 200
+        assert elapsed < MAX_REQUEST_SECONDS
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_prolific_reviewer_post(self, catalog, django_assert_max_num_queries):
+        from api.models import Review, Title
+        from .common import auth_client
+
+        reviewer = catalog['review'].author
+        titles = list(Title.objects.exclude(pk=catalog['title'].pk))
+        Review.objects.bulk_create(
+            Review(title=title, author=reviewer, text='Отзыв', score=5) for title in titles[:-1]
+        )
+        client = auth_client(reviewer)
+        with django_assert_max_num_queries(8):
+            response = client.post(f'/api/v1/titles/{titles[-1].id}/reviews/', data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 201
+        with django_assert_max_num_queries(4):
+            response = client.post(f'/api/v1/titles/{titles[0].id}/reviews/', data={'text': 'Отзыв', 'score': 5})
+        assert response.status_code == 400
+        assert response.json() == {'non_field_errors': ['Only one review allowed']}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_07_jwt_user_snapshot_cached(self, user_client, catalog, django_assert_num_queries):
+        from .common import auth_client
+
+        user_client.get('/api/v1/users/reviewer1/')
+        with django_assert_num_queries(1):
+            response = user_client.get('/api/v1/users/reviewer1/')
+        assert response.status_code == 200, \
+            'Проверьте, что повторный запрос с тем же токеном не загружает пользователя из базы'
+
+        reviewer = catalog['review'].author
+        reviewer_client = auth_client(reviewer)
+        assert reviewer_client.get('/api/v1/users/').status_code == 403
+        user_client.patch(f'/api/v1/users/{reviewer.username}/', data={'role': 'admin'})
+        assert reviewer_client.get('/api/v1/users/').status_code == 200, \
+            'Проверьте, что кэш пользователя сбрасывается при изменении пользователя'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_08_role_claims(self, admin, catalog, django_assert_num_queries):
+        from rest_framework.test import APIClient
+        from api.serializers import ConfirmationCodeSerializer
+
+        token = ConfirmationCodeSerializer.get_token(admin)
+        assert token['role'] == 'admin' and token['username'] == admin.username
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/users/reviewer1/')
+        assert response.status_code == 200, \
+            'Проверьте, что права администратора проверяются по claim `role` без запроса пользователя'
+
+        admin.role = 'user'
+        admin.save()
+        response = client.get('/api/v1/users/reviewer1/')
+        assert response.status_code == 401, \
+            'Проверьте, что токен с устаревшей ролью отзывается после изменения пользователя'
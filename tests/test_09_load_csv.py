@@ -0,0 +1,41 @@
+import csv
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from api.models import Comment, Genre, Review, Title
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'data')
+
+
+def csv_rows(name):
+    with open(os.path.join(DATA_DIR, f'{name}.csv'), encoding='utf-8') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+class Test09LoadCSV:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_load_csv(self):
+        out = StringIO()
+        call_command('load_csv', '--batch-size', '7', stdout=out)
+        assert Title.objects.count() == len(csv_rows('titles'))
+        assert Genre.objects.count() == len(csv_rows('genre'))
+        assert Title.genre.through.objects.count() == len(csv_rows('genre_title'))
+        review_keys = {(row['title_id'], row['author']) for row in csv_rows('review')}
+        assert Review.objects.count() == len(review_keys), \
+            'Проверьте, что `load_csv` пропускает повторные отзывы автора на одно произведение'
+        assert Comment.objects.count() == len(csv_rows('comments'))
+        assert 'rows/s' in out.getvalue()
+
+        review_row = csv_rows('review')[0]
+        review = Review.objects.get(pk=review_row['id'])
+        assert review.pub_date.isoformat().startswith(review_row['pub_date'][:19]), \
+            'Проверьте, что `load_csv` сохраняет дату публикации из файла'
+        title = Title.objects.get(pk=review_row['title_id'])
+        scores = [int(row['score']) for row in csv_rows('review')
+                  if row['title_id'] == review_row['title_id']]
+        assert (title.rating_sum, title.rating_count) == (sum(scores), len(scores))
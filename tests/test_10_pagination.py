@@ -0,0 +1,76 @@
+from base64 import b64encode
+
+import pytest
+
+
+class Test10Pagination:
+
+    def walk_cursor_pages(self, client, url, total):
+        response = client.get(f'{url}?cursor=')
+        assert response.status_code == 200
+        first_page = response.json()
+        assert 'count' not in first_page, \
+            f'Проверьте, что GET `{url}?cursor=` не считает общее количество объектов'
+        assert first_page['previous'] is None
+        assert len(first_page['results']) == 10
+        response = client.get(first_page['next'])
+        second_page = response.json()
+        assert len(second_page['results']) == total - 10
+        assert second_page['next'] is None
+        seen = [item['id'] for item in first_page['results'] + second_page['results']]
+        assert len(set(seen)) == total, \
+            f'Проверьте, что курсорная пагинация `{url}` не повторяет и не теряет объекты'
+        response = client.get(second_page['previous'])
+        assert response.json()['results'] == first_page['results']
+        response = client.get(f'{url}?cursor=broken')
+        assert response.status_code == 404
+        huge = b64encode(f'0|2021-01-01T00:00:00+00:00|{"9" * 25}'.encode()).decode()
+        response = client.get(f'{url}?cursor={huge}')
+        assert response.status_code == 404, \
+            f'Проверьте, что курсор `{url}` со слишком большим id возвращает 404'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_cursor(self, client, catalog):
+        url = f'/api/v1/titles/{catalog["title"].id}/reviews/'
+        self.walk_cursor_pages(client, url, catalog['title'].reviews.count())
+        assert 'count' in client.get(url).json(), \
+            'Проверьте, что без параметра `cursor` отзывы пагинируются по номерам страниц'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_comments_cursor(self, client, catalog):
+        review = catalog['review']
+        url = f'/api/v1/titles/{catalog["title"].id}/reviews/{review.id}/comments/'
+        self.walk_cursor_pages(client, url, review.comments.count())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_titles_count_modes(self, client, catalog, monkeypatch, django_assert_num_queries):
+        from django.core.cache import cache
+        from api.pagination import EstimatedCountPagination
+
+        response = client.get('/api/v1/titles/')
+        data = response.json()
+        assert data['count'] == 15 and 'count_is_estimate' not in data
+        response = client.get(data['next'])
+        data = response.json()
+        assert len(data['results']) == 5 and data['next'] is None and data['count'] == 15
+        assert client.get(data['previous']).json()['results'] == client.get('/api/v1/titles/').json()['results']
+
+        with django_assert_num_queries(2):
+            data = client.get('/api/v1/titles/?count=none').json()
+        assert 'count' not in data, \
+            'Проверьте, что с `?count=none` GET `/api/v1/titles/` не возвращает `count`'
+        assert len(data['results']) == 10 and data['next']
+
+        monkeypatch.setattr(EstimatedCountPagination, 'max_count', 12)
+        cache.clear()
+        data = client.get('/api/v1/titles/').json()
+        assert data['count'] == 12 and data['count_is_estimate'] is True
+        data = client.get('/api/v1/titles/?count=exact').json()
+        assert data['count'] == 15 and 'count_is_estimate' not in data
+        assert client.get('/api/v1/titles/?page=5').status_code == 404
+
+        monkeypatch.setattr(EstimatedCountPagination, 'max_count', 4)
+        cache.clear()
+        data = client.get('/api/v1/titles/').json()
+        assert data['count'] == 11 and data['count_is_estimate'] is True, \
+            'Проверьте, что `count` за пределом `max_count` не меньше числа уже отданных объектов'
@@ -0,0 +1,76 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.models import QueuedEmail
+
+
+class Test11EmailQueue:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_queues_email(self, client, mailoutbox):
+        response = client.post('/api/v1/auth/email/', data={'email': 'new_user@yamdb.fake'})
+        assert response.status_code == 200
+        assert len(mailoutbox) == 0, \
+            'Проверьте, что POST `/api/v1/auth/email/` не отправляет письмо во время запроса'
+        queued = QueuedEmail.objects.get()
+        assert queued.to == 'new_user@yamdb.fake' and queued.sent_at is None
+
+        call_command('send_queued_emails', stdout=StringIO())
+        assert len(mailoutbox) == 1
+        assert mailoutbox[0].to == ['new_user@yamdb.fake']
+        assert response.json()['confirmation code'] in mailoutbox[0].body
+        queued.refresh_from_db()
+        assert queued.sent_at is not None and queued.attempts == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_failed_email_is_retried_later(self, mailoutbox, monkeypatch):
+        from django.core.mail import EmailMessage
+
+        def fail(self, *args, **kwargs):
+            raise ConnectionError('SMTP is down')
+
+        QueuedEmail.objects.create(subject='Тема', body='Текст', to='user@yamdb.fake')
+        monkeypatch.setattr(EmailMessage, 'send', fail)
+        call_command('send_queued_emails', stdout=StringIO())
+        queued = QueuedEmail.objects.get()
+        assert queued.sent_at is None and queued.attempts == 1
+        assert 'SMTP is down' in queued.last_error
+        assert queued.send_after > queued.created
+
+        monkeypatch.undo()
+        call_command('send_queued_emails', stdout=StringIO())
+        assert len(mailoutbox) == 0, 'Проверьте, что письмо повторно отправляется только после паузы'
+        QueuedEmail.objects.update(send_after=queued.created)
+        call_command('send_queued_emails', stdout=StringIO())
+        assert len(mailoutbox) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_unreachable_backend_backs_off(self, mailoutbox, monkeypatch):
+        from django.core.mail.backends.locmem import EmailBackend
+
+        def refuse(self):
+            raise ConnectionRefusedError('SMTP is unreachable')
+
+        QueuedEmail.objects.create(subject='Тема', body='Текст', to='first@yamdb.fake')
+        QueuedEmail.objects.create(subject='Тема', body='Текст', to='second@yamdb.fake')
+        monkeypatch.setattr(EmailBackend, 'open', refuse, raising=False)
+        out = StringIO()
+        call_command('send_queued_emails', stdout=out)
+        assert 'failed 2' in out.getvalue(), \
+            'Проверьте, что ошибка подключения к почтовому серверу не роняет воркер'
+        for queued in QueuedEmail.objects.all():
+            assert queued.attempts == 1 and 'SMTP is unreachable' in queued.last_error
+            assert queued.send_after > queued.created and queued.sent_at is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_claimed_emails_are_leased(self, mailoutbox):
+        from api.outbox import claim_due_emails
+
+        QueuedEmail.objects.create(subject='Тема', body='Текст', to='user@yamdb.fake')
+        assert len(claim_due_emails(10)) == 1
+        assert claim_due_emails(10) == [], \
+            'Проверьте, что письма, взятые воркером, не отправляются другим воркером повторно'
+        call_command('send_queued_emails', stdout=StringIO())
+        assert len(mailoutbox) == 0
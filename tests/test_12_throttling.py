@@ -0,0 +1,77 @@
+import pytest
+
+from api.models import QueuedEmail
+
+
+class Test12AuthThrottling:
+
+    @pytest.fixture
+    def rates(self, settings):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                'auth_email.ip': '3/min',
+                'auth_email.email': '2/hour',
+                'auth_token.email': '1/hour',
+            },
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_throttled_per_email(self, client, rates, django_assert_num_queries):
+        for _ in range(2):
+            response = client.post('/api/v1/auth/email/', data={'email': 'spam@yamdb.fake'})
+            assert response.status_code == 200
+        with django_assert_num_queries(0):
+            response = client.post('/api/v1/auth/email/', data={'email': 'SPAM@yamdb.fake'})
+        assert response.status_code == 429, \
+            'Проверьте, что POST `/api/v1/auth/email/` ограничивает число запросов для одного email'
+        assert int(response['Retry-After']) > 0
+        assert QueuedEmail.objects.count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_signup_throttled_per_ip(self, client, rates):
+        statuses = [
+            client.post('/api/v1/auth/email/', data={'email': f'user{number}@yamdb.fake'}).status_code
+            for number in range(4)
+        ]
+        assert statuses == [200, 200, 200, 429], \
+            'Проверьте, что POST `/api/v1/auth/email/` ограничивает число запросов с одного IP'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_token_throttled_per_email(self, client, rates):
+        data = {'email': 'guess@yamdb.fake', 'confirmation_code': 'wrong'}
+        assert client.post('/api/v1/auth/token/', data=data).status_code == 400
+        assert client.post('/api/v1/auth/token/', data=data).status_code == 429, \
+            'Проверьте, что POST `/api/v1/auth/token/` ограничивает подбор кода для одного email'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_concurrent_requests_share_bucket(self, rates):
+        from concurrent.futures import ThreadPoolExecutor
+        from rest_framework.test import APIRequestFactory
+        from api.throttling import SignupIPThrottle
+
+        request = APIRequestFactory().post('/api/v1/auth/email/')
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            allowed = list(pool.map(lambda _: SignupIPThrottle().allow_request(request, None), range(16)))
+        assert allowed.count(True) == 3, \
+            'Проверьте, что параллельные запросы не обходят ограничение token bucket'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_email_is_hashed_in_cache_key(self, client, rates):
+        from api.throttling import SignupEmailThrottle
+
+        email = 'with space and a very long local part ' * 10 + '@yamdb.fake'
+        key = SignupEmailThrottle().get_cache_key(email.lower())
+        assert ' ' not in key and len(key) < 250, \
+            'Проверьте, что email хешируется в ключе кэша (ограничения ключей memcached)'
+        response = client.post('/api/v1/auth/email/', data={'email': email})
+        assert response.status_code == 400
+
+    def test_06_throttling_needs_shared_cache(self, settings):
+        from api.checks import check_throttle_cache
+
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        assert [error.id for error in check_throttle_cache(None)] == ['api.W001'], \
+            'Проверьте, что `check --deploy` сообщает о счётчиках лимитов в кэше, локальном для процесса'
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache'}}
+        assert check_throttle_cache(None) == []
@@ -0,0 +1,36 @@
+import pytest
+from django.db import connection
+
+from api.models import Comment, Review, Title
+from api.filters import TitleFilter
+
+
+def plan(queryset):
+    return queryset.explain()
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN output is SQLite specific')
+class Test13Indexes:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_by_title_ordered_by_pub_date(self, catalog):
+        output = plan(Review.objects.filter(title=catalog['title']).order_by('-pub_date', '-id')[:10])
+        assert 'review_title_pub_date_idx' in output, output
+        assert 'TEMP B-TREE' not in output, 'Проверьте, что сортировка отзывов выполняется по индексу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_comments_by_review_ordered_by_pub_date(self, catalog):
+        output = plan(Comment.objects.filter(review=catalog['review']).order_by('-pub_date', '-id')[:10])
+        assert 'comment_review_pub_date_idx' in output, output
+        assert 'TEMP B-TREE' not in output
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_titles_by_category_and_year(self, catalog):
+        output = plan(Title.objects.filter(category__slug='category-0', year=2003))
+        assert 'title_category_year_idx' in output, output
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_titles_by_genre(self, catalog):
+        queryset = TitleFilter({'genre': 'genre-0'}, queryset=Title.objects.all()).qs
+        output = plan(queryset)
+        assert 'api_title_genre_genre_title_idx' in output, output
@@ -0,0 +1,141 @@
+import pytest
+
+from .common import create_categories, create_genre
+
+
+class Test14BulkAPI:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_genres_and_categories(self, client, user_client):
+        genres = [{'name': f'Жанр {number}', 'slug': f'bulk-genre-{number}'}
+                  for number in range(20)]
+        response = user_client.post('/api/v1/bulk/genres/', data=genres, format='json')
+        assert response.status_code == 201, \
+            'Проверьте, что при POST запросе `/api/v1/bulk/genres/` со списком жанров возвращается статус 201'
+        assert response.json() == genres, \
+            'Проверьте, что при POST запросе `/api/v1/bulk/genres/` возвращаются созданные жанры'
+        response = client.get('/api/v1/genres/?search=Жанр 19')
+        assert response.json()['count'] == 1, \
+            'Проверьте, что после массового создания кэш списка жанров сбрасывается'
+        response = client.post('/api/v1/bulk/genres/', data=genres, content_type='application/json')
+        assert response.status_code == 401, \
+            'Проверьте, что массовое создание жанров доступно только администратору'
+
+        response = user_client.post('/api/v1/bulk/categories/', data=[
+            {'name': 'Фильм', 'slug': 'films'},
+            {'name': 'Книга', 'slug': 'books'},
+        ], format='json')
+        assert response.status_code == 201
+        response = user_client.delete('/api/v1/bulk/categories/', data=['films', 'books'], format='json')
+        assert response.status_code == 204, \
+            'Проверьте, что при DELETE запросе `/api/v1/bulk/categories/` возвращается статус 204'
+        assert client.get('/api/v1/categories/').json()['count'] == 0, \
+            'Проверьте, что при DELETE запросе `/api/v1/bulk/categories/` категории удаляются'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_bulk_errors_per_item(self, user_client):
+        create_genre(user_client)
+        response = user_client.post('/api/v1/bulk/genres/', data=[
+            {'name': 'Новый', 'slug': 'new'},
+            {'name': 'Дубль', 'slug': 'new'},
+            {'name': 'Ужасы', 'slug': 'horror'},
+            {'slug': 'no-name'},
+        ], format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что при ошибках в элементах `/api/v1/bulk/genres/` возвращается статус 400'
+        errors = response.json()
+        assert len(errors) == 4 and errors[0] == {}, \
+            'Проверьте, что ошибки возвращаются списком, соответствующим элементам запроса'
+        assert 'slug' in errors[1] and 'slug' in errors[2] and 'name' in errors[3]
+        assert user_client.get('/api/v1/genres/?search=Новый').json()['count'] == 0, \
+            'Проверьте, что при ошибке в одном элементе ничего не создается'
+        response = user_client.delete('/api/v1/bulk/genres/', data=['horror', 'missing'], format='json')
+        assert response.status_code == 400
+        assert response.json() == [{}, {'slug': ['Not found']}]
+        response = user_client.post('/api/v1/bulk/genres/', data={'name': 'Жанр'}, format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что `/api/v1/bulk/genres/` принимает только список'
+        response = user_client.post('/api/v1/bulk/genres/', data=[{'name': 'Жанр', 'slug': 'ok'}, None, 'x'],
+                                    format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что элементы `/api/v1/bulk/genres/`, не являющиеся объектами, отклоняются со статусом 400'
+        assert response.json() == [{}, {'non_field_errors': ['Expected a dictionary']},
+                                   {'non_field_errors': ['Expected a dictionary']}]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_bulk_titles(self, user_client, django_assert_num_queries):
+        genres = create_genre(user_client)
+        categories = create_categories(user_client)
+        titles = [{'name': f'Произведение {number}', 'year': 1990 + number, 'description': 'Описание',
+                   'genre': [genres[0]['slug'], genres[number % 3]['slug']],
+                   'category': categories[number % 2]['slug']}
+                  for number in range(30)]
+        # genres, categories, BEGIN, reserve ids (UPDATE and SELECT of the
+        # SQLite sequence), INSERT titles, INSERT genre links, created
+        # titles and their genres for the response
+        with django_assert_num_queries(9):
+            response = user_client.post('/api/v1/bulk/titles/', data=titles, format='json')
+        assert response.status_code == 201, \
+            'Проверьте, что при POST запросе `/api/v1/bulk/titles/` возвращается статус 201'
+        created = response.json()
+        assert [title['name'] for title in created] == [title['name'] for title in titles]
+        assert created[1]['category'] == categories[1]
+        assert {genre['slug'] for genre in created[1]['genre']} == {genres[0]['slug'], genres[1]['slug']}
+        response = user_client.get(f'/api/v1/titles/?genre={genres[2]["slug"]}')
+        assert response.json()['count'] == 10, \
+            'Проверьте, что связи с жанрами создаются при массовом создании произведений'
+
+        response = user_client.post('/api/v1/bulk/titles/', data=[
+            {'name': 'Без категории', 'year': 2000, 'category': 'missing'},
+            {'name': 'Без жанра', 'year': 2000, 'genre': ['missing']},
+            {'name': 'Без года'},
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert 'category' in errors[0] and 'genre' in errors[1] and 'year' in errors[2]
+
+        response = user_client.patch('/api/v1/bulk/titles/', data=[
+            {'id': str(created[0]['id']), 'name': 'Новое имя', 'genre': [genres[2]['slug']]},
+            {'id': created[1]['id'], 'category': categories[0]['slug']},
+        ], format='json')
+        assert response.status_code == 200, \
+            'Проверьте, что при PATCH запросе `/api/v1/bulk/titles/` возвращается статус 200'
+        updated = response.json()
+        assert updated[0]['id'] == created[0]['id'], \
+            'Проверьте, что `id` строкой в PATCH `/api/v1/bulk/titles/` находит произведение'
+        response = user_client.patch('/api/v1/bulk/titles/', data=[{'id': 'abc', 'name': 'Имя'}], format='json')
+        assert response.status_code == 400 and response.json() == [{'id': ['Not found']}]
+        response = user_client.delete('/api/v1/bulk/titles/', data=['abc', '1.5', '1' * 25, created[0]['id']],
+                                      format='json')
+        assert response.status_code == 400, \
+            'Проверьте, что нечисловые id в DELETE `/api/v1/bulk/titles/` возвращают статус 400'
+        assert response.json() == [{'id': ['Not found']}] * 3 + [{}]
+        assert updated[0]['name'] == 'Новое имя'
+        assert updated[0]['genre'] == [genres[2]]
+        assert updated[1]['category'] == categories[0]
+        response = user_client.get(f'/api/v1/titles/{created[0]["id"]}/')
+        assert response.json()['name'] == 'Новое имя', \
+            'Проверьте, что после массового изменения кэш произведения сбрасывается'
+
+        response = user_client.delete('/api/v1/bulk/titles/',
+                                      data=[title['id'] for title in created[:10]], format='json')
+        assert response.status_code == 204
+        assert user_client.get('/api/v1/titles/').json()['count'] == 20
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_bulk_does_not_shadow_slug(self, client, user_client):
+        from api.bulk import bulk_create_with_pks
+        from api.models import Genre
+
+        user_client.post('/api/v1/genres/', data={'name': 'Булк', 'slug': 'bulk'})
+        response = user_client.delete('/api/v1/genres/bulk/')
+        assert response.status_code == 204, \
+            'Проверьте, что жанр со slug `bulk` можно удалить: массовые операции не должны перекрывать его адрес'
+        assert not Genre.objects.filter(slug='bulk').exists()
+
+        Genre.objects.create(name='Ужасы', slug='horror')
+        genres = bulk_create_with_pks(Genre, [Genre(name=f'Жанр {number}', slug=f'genre-{number}')
+                                              for number in range(3)])
+        Genre.objects.create(name='Драма', slug='drama')
+        assert [Genre.objects.get(pk=genre.pk).slug for genre in genres] == ['genre-0', 'genre-1', 'genre-2'], \
+            'Проверьте, что созданным пачкой объектам назначаются их собственные id'
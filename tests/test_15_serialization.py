@@ -0,0 +1,71 @@
+import pytest
+
+from api.rows import RowListMixin
+
+LIST_ENDPOINTS = [
+    '/api/v1/titles/',
+    '/api/v1/titles/?genre=genre-0&category=category-1',
+    '/api/v1/titles/?fields=id,rating,genre',
+    '/api/v1/titles/{title}/reviews/',
+    '/api/v1/titles/{title}/reviews/?cursor=',
+    '/api/v1/titles/{title}/reviews/?expand=&fields=id,title,pub_date',
+    '/api/v1/titles/{title}/reviews/{review}/comments/',
+    '/api/v1/genres/',
+    '/api/v1/categories/',
+]
+
+
+class Test15Serialization:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_row_serialization_matches_drf(self, client, catalog, monkeypatch):
+        from django.core.cache import cache
+        from api.models import Review
+
+        Review.objects.filter(pk=catalog['review'].pk).update(score=8)
+        urls = [url.format(title=catalog['title'].id, review=catalog['review'].id) for url in LIST_ENDPOINTS]
+        fast = {url: client.get(url) for url in urls}
+        for url, response in fast.items():
+            assert response.status_code == 200, url
+        cache.clear()
+        monkeypatch.setattr(RowListMixin, 'get_row_serializer', lambda self, queryset: None)
+        monkeypatch.setattr('api.renderers.orjson', None)
+        for url in urls:
+            assert client.get(url).content == fast[url].content, \
+                f'Проверьте, что быстрый путь сериализации `{url}` возвращает те же байты, что и DRF'
+
+    def test_02_serializers_compile(self):
+        from api.models import Category, Comment, Genre, Review, Title
+        from api.rows import compile_serializer
+        from api.serializers import (
+            CategorySerializer, CommentSerializer, GenreSerializer, ReviewSerializer, TitlesSerializer
+        )
+
+        for serializer, model in ((TitlesSerializer(), Title), (ReviewSerializer(), Review),
+                                  (CommentSerializer(), Comment), (GenreSerializer(), Genre),
+                                  (CategorySerializer(), Category)):
+            assert compile_serializer(serializer, model) is not None, \
+                f'Проверьте, что {type(serializer).__name__} сериализуется из строк `.values()`'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_row_serialization_queries(self, client, catalog, django_assert_num_queries):
+        # page of titles, their genres, capped count
+        with django_assert_num_queries(3):
+            client.get('/api/v1/titles/')
+        # title, page of reviews with title and category joined, genres of the title
+        with django_assert_num_queries(3):
+            client.get(f'/api/v1/titles/{catalog["title"].id}/reviews/?cursor=')
+
+    def test_04_renderer_matches_json_renderer(self, monkeypatch):
+        import datetime
+        from rest_framework.renderers import JSONRenderer
+        from api.renderers import FastJSONRenderer
+
+        data = {'text': 'Строка с разделителем \u2028 и \u2029',
+                'pub_date': datetime.datetime(2021, 1, 26, 15, 21, 0, 499958, tzinfo=datetime.timezone.utc),
+                1: 'ключ не строка'}
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+        del data[1]
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert FastJSONRenderer().render(data, 'application/json; indent=4') == \
+            JSONRenderer().render(data, 'application/json; indent=4')
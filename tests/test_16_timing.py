@@ -0,0 +1,51 @@
+import json
+import logging
+
+import pytest
+
+
+class Test16Timing:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_server_timing_header(self, client, catalog, settings):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        settings.REQUEST_TIMING_HEADER = False
+        response = client.get(f'/api/v1/titles/{catalog["title"].id}/reviews/')
+        assert 'Server-Timing' not in response, \
+            'Проверьте, что заголовок `Server-Timing` отправляется только при REQUEST_TIMING_HEADER'
+        settings.REQUEST_TIMING_HEADER = True
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/v1/titles/{catalog["title"].id}/reviews/')
+        assert response.status_code == 200
+        header = response['Server-Timing']
+        for metric in ('db;dur=', 'serialize;dur=', 'render;dur=', 'total;dur='):
+            assert metric in header, \
+                f'Проверьте, что заголовок `Server-Timing` содержит `{metric}`'
+        timings = response.timings
+        assert timings.queries == len(queries), 'Проверьте, что middleware считает SQL-запросы запроса'
+        assert 0 < timings.sql < timings.total
+        assert f'desc="{timings.queries} queries"' in header
+
+        response = client.get(f'/api/v1/titles/{catalog["title"].id}/')
+        assert 'serialize;dur=' in response['Server-Timing'], \
+            'Проверьте, что время сериализации учитывается и для пути через DRF'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_slow_requests_logged(self, client, catalog, settings, caplog):
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            client.get('/api/v1/genres/')
+        record = caplog.records[-1]
+        line = json.loads(record.getMessage())
+        assert record.levelno == logging.INFO and not line['slow']
+        assert line['path'] == '/api/v1/genres/' and line['status'] == 200
+        assert {'queries', 'sql_ms', 'total_ms'} <= set(line), \
+            'Проверьте, что в лог пишется структурированная строка с метриками запроса'
+
+        settings.REQUEST_TIMING_MAX_QUERIES = 0
+        with caplog.at_level(logging.WARNING, logger='api.timing'):
+            client.get('/api/v1/categories/')
+        record = caplog.records[-1]
+        assert record.levelno == logging.WARNING and json.loads(record.getMessage())['slow'], \
+            'Проверьте, что запросы сверх порогов помечаются как медленные'
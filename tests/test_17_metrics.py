@@ -0,0 +1,123 @@
+import json
+import re
+
+import pytest
+
+
+def parse(text):
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    return samples
+
+
+def sample(samples, name, **labels):
+    for key, value in samples.items():
+        match = re.fullmatch(rf'{name}(?:\{{(.*)\}})?', key)
+        if not match:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match.group(1) or ''))
+        if found == {k: str(v) for k, v in labels.items()}:
+            return value
+    return None
+
+
+class Test17Metrics:
+
+    @pytest.fixture(autouse=True)
+    def fresh_registry(self, settings):
+        from api.metrics import registry
+
+        settings.METRICS_DIR = None
+        settings.METRICS_TOKEN = None
+        settings.METRICS_ALLOWED_NETWORKS = ['127.0.0.0/8']
+        registry.reset()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_requests_counted(self, client):
+        for _ in range(3):
+            client.get('/api/v1/genres/')
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain'), \
+            'Проверьте, что `/metrics` отдаёт текстовый формат Prometheus'
+        samples = parse(response.content.decode())
+        labels = {'view': 'genres-list', 'method': 'GET'}
+        assert sample(samples, 'api_requests_total', status=200, **labels) == 3, \
+            'Проверьте, что запросы считаются по представлению, методу и статусу'
+        assert sample(samples, 'api_request_duration_seconds_count', **labels) == 3
+        assert sample(samples, 'api_request_duration_seconds_bucket', le='+Inf', **labels) == 3
+        buckets = [value for key, value in samples.items()
+                   if key.startswith('api_request_duration_seconds_bucket')]
+        assert buckets == sorted(buckets), \
+            'Проверьте, что бакеты гистограммы накопительные'
+        assert sample(samples, 'api_db_queries_total', **labels) > 0, \
+            'Проверьте, что считаются SQL-запросы по представлениям'
+        assert sample(samples, 'api_cache_requests_total', namespace='genres', result='miss') == 1
+        assert sample(samples, 'api_cache_requests_total', namespace='genres', result='hit') == 2, \
+            'Проверьте, что считаются попадания и промахи кэша'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_email_queue_depth(self, client):
+        from api.models import QueuedEmail
+
+        QueuedEmail.objects.create(subject='s', body='b', to='a@example.com')
+        QueuedEmail.objects.create(subject='s', body='b', to='b@example.com', attempts=99)
+        samples = parse(client.get('/metrics').content.decode())
+        assert sample(samples, 'api_email_queue_depth', state='pending') == 1
+        assert sample(samples, 'api_email_queue_depth', state='failed') == 1, \
+            'Проверьте, что `/metrics` показывает глубину очереди писем'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_workers_merged(self, client, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        labels = [['method', 'GET'], ['status', 200], ['view', 'genres-list']]
+        (tmp_path / '1-other.json').write_text(json.dumps({
+            'counters': [['api_requests_total', labels, 5]],
+            'histograms': [],
+        }))
+        client.get('/api/v1/genres/')
+        samples = parse(client.get('/metrics').content.decode())
+        assert sample(samples, 'api_requests_total', method='GET', status=200,
+                      view='genres-list') == 6, \
+            'Проверьте, что `/metrics` суммирует метрики всех процессов из METRICS_DIR'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_token(self, client, settings):
+        settings.METRICS_ALLOWED_NETWORKS = []
+        assert client.get('/metrics').status_code == 403, \
+            'Проверьте, что по умолчанию `/metrics` закрыт'
+        settings.METRICS_TOKEN = 'secret'
+        assert client.get('/metrics').status_code == 401, \
+            'Проверьте, что без токена `/metrics` недоступен'
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
+        assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer сек').status_code == 401
+        settings.METRICS_ALLOWED_NETWORKS = ['127.0.0.1/32']
+        assert client.get('/metrics').status_code == 200, \
+            'Проверьте, что `/metrics` доступен из сетей METRICS_ALLOWED_NETWORKS'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_exited_workers_compacted(self, client, settings, tmp_path):
+        import subprocess
+        import sys
+
+        settings.METRICS_DIR = str(tmp_path)
+        exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                capture_output=True, text=True).stdout.strip()
+        labels = [['method', 'GET'], ['status', 200], ['view', 'genres-list']]
+        for number in range(3):
+            (tmp_path / f'{exited}-{number}.json').write_text(json.dumps({
+                'counters': [['api_requests_total', labels, 5]],
+                'histograms': [],
+            }))
+        for _ in range(2):
+            samples = parse(client.get('/metrics').content.decode())
+            assert sample(samples, 'api_requests_total', method='GET', status=200,
+                          view='genres-list') == 15
+        files = sorted(path.name for path in tmp_path.glob('*.json'))
+        assert not any(name.startswith(f'{exited}-') for name in files) and 'totals.json' in files, \
+            'Проверьте, что файлы завершившихся процессов сворачиваются в totals.json'
@@ -0,0 +1,62 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+
+from api.models import Comment, Review, Title
+
+
+class Test18LoadTesting:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_generate_dataset(self):
+        from users.models import User
+
+        call_command(
+            'generate_dataset', users=30, categories=3, genres=5, titles=40,
+            reviews=300, comments=500, seed=1, stdout=StringIO(),
+        )
+        assert User.objects.count() == 30
+        assert Title.objects.count() == 40
+        assert Review.objects.count() == 300
+        assert Comment.objects.count() == 500
+        assert not Title.objects.filter(genre=None).exists(), \
+            'Проверьте, что у каждого произведения есть жанры'
+        per_title = sorted(Title.objects.annotate(
+            total=Count('reviews')).values_list('total', flat=True), reverse=True)
+        assert per_title[0] > 3 * per_title[len(per_title) // 2], \
+            'Проверьте, что отзывы распределены неравномерно: у популярных произведений их больше'
+        title = Title.objects.order_by('-rating_count').first()
+        assert title.rating_count == title.reviews.exclude(score=None).count(), \
+            'Проверьте, что после генерации пересчитываются рейтинги'
+
+        call_command('generate_dataset', users=5, categories=0, genres=0, titles=5,
+                     reviews=25, comments=0, stdout=StringIO())
+        assert Review.objects.count() == 325, \
+            'Проверьте, что повторный запуск добавляет данные, а отзывы могут занять все пары'
+        with pytest.raises(CommandError):
+            call_command('generate_dataset', users=1, titles=1, reviews=2, stdout=StringIO())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_load_test(self, tmp_path):
+        call_command(
+            'generate_dataset', users=10, categories=2, genres=3, titles=10,
+            reviews=40, comments=40, seed=1, stdout=StringIO(),
+        )
+        out = StringIO()
+        output = tmp_path / 'report.json'
+        call_command('load_test', requests=60, concurrency=1, write_ratio=0.3,
+                     seed=1, output=str(output), stdout=out)
+        report = json.loads(output.read_text())
+        assert sum(row['requests'] for row in report.values()) == 60
+        assert {'GET titles/', 'POST titles/{id}/reviews/{id}/comments/'} <= set(report)
+        for endpoint, row in report.items():
+            assert row['p50_ms'] <= row['p95_ms'] <= row['p99_ms'] <= row['max_ms']
+            if endpoint.startswith('GET'):
+                assert row['errors'] == 0, f'Проверьте запросы {endpoint}: {row["statuses"]}'
+        assert report['POST titles/{id}/reviews/{id}/comments/']['statuses'] == {
+            '201': report['POST titles/{id}/reviews/{id}/comments/']['requests']
+        }, 'Проверьте, что запросы на запись выполняются от имени пользователей'
+        assert 'p95, ms' in out.getvalue()
@@ -0,0 +1,55 @@
+import json
+import logging
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+class Test19Replay:
+
+    @pytest.fixture
+    def request_log(self, client, catalog, caplog, tmp_path):
+        title = catalog['title']
+        with caplog.at_level(logging.INFO, logger='api.timing'):
+            for path in ('/api/v1/titles/?genre=genre-1', f'/api/v1/titles/{title.id}/',
+                         f'/api/v1/titles/{title.id}/reviews/', '/api/v1/genres/'):
+                client.get(path)
+            client.post(f'/api/v1/titles/{title.id}/reviews/', data={'text': 'x', 'score': 5})
+        log = tmp_path / 'requests.jsonl'
+        log.write_text('\n'.join(
+            [record.getMessage() for record in caplog.records if record.name == 'api.timing']
+            + ['Bad Request: /api/v1/', json.dumps({'request_id': 'user-001'})]
+        ) + '\n')
+        return log
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('mode', ['threads', 'asyncio'])
+    def test_01_replay(self, request_log, tmp_path, mode):
+        out = StringIO()
+        output = tmp_path / f'{mode}.json'
+        call_command('replay_requests', str(request_log), workers=1, mode=mode,
+                     output=str(output), stdout=out)
+        report = json.loads(output.read_text())
+        assert set(report) == {
+            'GET titles/', 'GET titles/{id}/', 'GET titles/{id}/reviews/', 'GET genres/',
+        }, 'Проверьте, что запросы из лога группируются по эндпоинтам, а запись по умолчанию пропускается'
+        assert all(row['statuses'] == {'200': 1} for row in report.values()), \
+            'Проверьте, что запросы воспроизводятся вместе со строкой запроса'
+        text = out.getvalue()
+        assert '1 lines skipped: POST not replayed' in text
+        assert '1 lines skipped: no method or path' in text
+        assert '1 lines skipped: not JSON' in text
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_compare(self, request_log, tmp_path):
+        baseline = tmp_path / 'baseline.json'
+        call_command('replay_requests', str(request_log), workers=1,
+                     output=str(baseline), stdout=StringIO())
+        out = StringIO()
+        call_command('replay_requests', str(request_log), workers=1, limit=2,
+                     baseline=str(baseline), stdout=out)
+        text = out.getvalue()
+        assert 'baseline -> this run' in text
+        assert 'GET titles/{id}/reviews/' in text and 'only in the baseline run' in text, \
+            'Проверьте, что сравнение показывает эндпоинты обоих прогонов'
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, AsyncRequestFactory
+
+
+class Test20Async:
+
+    @pytest.fixture
+    def async_urls(self, settings):
+        """URLconf built with ASYNC_READ_VIEWS, as under api_yamdb.asgi"""
+        import importlib
+        from django.urls import clear_url_caches
+        import api.urls
+        import api_yamdb.urls
+
+        def reload():
+            importlib.reload(api.urls)
+            importlib.reload(api_yamdb.urls)
+            clear_url_caches()
+
+        settings.ASYNC_READ_VIEWS = True
+        reload()
+        yield reload
+        settings.ASYNC_READ_VIEWS = False
+        reload()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_async_read_views(self, client, catalog, settings):
+        from api.timing import RequestTimings, current_timings
+        from api.views import CommentViewSet, ReviewViewSet, TitleViewSet
+
+        settings.ASYNC_READ_VIEWS = False
+        assert not asyncio.iscoroutinefunction(TitleViewSet.as_view({'get': 'list'}))
+
+        settings.ASYNC_READ_VIEWS = True
+        title, review, comment = catalog['title'], catalog['review'], catalog['comment']
+        cases = [
+            (TitleViewSet, {'get': 'list', 'post': 'create'}, '/api/v1/titles/', {}),
+            (TitleViewSet, {'get': 'retrieve'}, f'/api/v1/titles/{title.id}/', {'pk': title.id}),
+            (ReviewViewSet, {'get': 'list'}, f'/api/v1/titles/{title.id}/reviews/',
+             {'title_id': title.id}),
+            (CommentViewSet, {'get': 'retrieve'},
+             f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/{comment.id}/',
+             {'title_id': title.id, 'review_id': review.id, 'pk': comment.id}),
+        ]
+        factory = AsyncRequestFactory()
+        for viewset, actions, path, kwargs in cases:
+            view = viewset.as_view(actions)
+            assert asyncio.iscoroutinefunction(view), \
+                f'Проверьте, что `{path}` обслуживается асинхронным представлением'
+            timings = RequestTimings()
+            token = current_timings.set(timings)
+            try:
+                response = async_to_sync(view)(factory.get(path), **kwargs)
+            finally:
+                current_timings.reset(token)
+            assert response.status_code == 200
+            assert json.loads(response.content) == client.get(path).json(), \
+                f'Проверьте, что асинхронный `{path}` отвечает так же, как синхронный'
+            assert timings.queries > 0, \
+                'Проверьте, что запросы к базе из пула потоков учитываются в метриках запроса'
+
+        view = TitleViewSet.as_view({'get': 'list', 'post': 'create'})
+        response = async_to_sync(view)(factory.post('/api/v1/titles/', {}))
+        assert response.status_code == 401, \
+            'Проверьте, что запись через асинхронное представление идёт в синхронный обработчик'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_async_middleware(self, catalog, settings):
+        settings.REQUEST_TIMING_HEADER = True
+
+        async def get(path):
+            return await AsyncClient().get(path)
+
+        response = async_to_sync(get)(f'/api/v1/titles/{catalog["title"].id}/')
+        assert response.status_code == 200
+        assert response.timings.queries > 0, \
+            'Проверьте, что под ASGI middleware считает SQL-запросы'
+        assert 'Server-Timing' in response
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_asgi_reads_in_pool(self, client, catalog, async_urls, settings, tmp_path, monkeypatch):
+        import threading
+        from api import asyncviews
+        from api.metrics import registry
+
+        threads = []
+        render = asyncviews.render
+
+        def spy(view, request, *args, **kwargs):
+            threads.append(threading.current_thread())
+            return render(view, request, *args, **kwargs)
+
+        settings.METRICS_DIR = str(tmp_path)
+        monkeypatch.setattr(asyncviews, 'render', spy)
+        registry.reset()
+        title, review = catalog['title'], catalog['review']
+        paths = ['/api/v1/titles/', f'/api/v1/titles/{title.id}/',
+                 f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/']
+
+        async def get_all():
+            return [await AsyncClient().get(path) for path in paths]
+
+        # Views built after the spy is installed call it
+        async_urls()
+        responses = async_to_sync(get_all)()
+        assert len(threads) == len(paths) and threading.main_thread() not in threads, \
+            'Проверьте, что под ASGI чтение идёт в пуле потоков, а не в потоке цикла событий'
+        assert list(tmp_path.glob('*.json')), \
+            'Проверьте, что метрики сбрасываются в METRICS_DIR и при асинхронных запросах'
+        for path, response in zip(paths, responses):
+            assert response.status_code == 200
+            assert json.loads(response.content) == client.get(path).json(), \
+                f'Проверьте, что `{path}` под ASGI отвечает так же, как синхронный'